@@ -1,13 +1,40 @@
-def unzip_files():
+def extract_zip(totalfilepath, targetpath, suffix, chunk_size):
+    # helper function extracts the file with the given suffix from one zipfile, names the extracted
+    # file after the zipfile, and streams it to disk in chunks of chunk_size bytes so memory use
+    # doesn't grow with the size of the member - returns the zipfile name, bytes written, and
+    # seconds taken (run in a worker process by unzip_files)
+
+    import os
+    import re
+    import shutil
+    import time
+    import zipfile
+
+    start = time.perf_counter()
+    written = 0
+    file = os.path.basename(totalfilepath)
+    with zipfile.ZipFile(totalfilepath) as zf:  # open the zip file
+        for item in zf.namelist():  # loop through the list of files to extract
+            if re.search(rf'{suffix}\Z', str(item)):
+                filename = file.replace(".zip","") + ".csv" # replace .zip with .csv
+                filepath = os.path.join(targetpath, filename)  # output path
+                with zf.open(item) as source, open(filepath, "wb") as f:  # open the output path for writing
+                    shutil.copyfileobj(source, f, chunk_size)  # stream the contents of the file into it
+                written += zf.getinfo(item).file_size
+    return file, written, time.perf_counter() - start
+
+
+def unzip_files(workers=None, chunk_size=1024 * 1024, files=None):
 
     # function unzips all zipfiles in sourcepath folder, extracts the file with the given suffix,
     # and names the extracted file after the zipfile (since the csv file names within don't describe
-    # contents)
+    # contents) - zipfiles are extracted in parallel by a pool of worker processes (one per cpu
+    # by default), and the bytes and throughput of each are reported; files limits extraction to
+    # the named zipfiles
 
-    import zipfile
+    from concurrent.futures import ProcessPoolExecutor, as_completed
     import os
-    import pandas as pd
-    import re
+    import time
 
     # create variables to hold directory to pull .zip files from, directory to deposit extracted .csvs into,
     # and csv name ending to extract
@@ -21,16 +48,22 @@ def unzip_files():
 
     # extract .csv ending in _Data.csv from each .zip file, name .csv file after .zip file,
     # and deposit into the targetpath
-    for file in os.listdir(sourcepath):  # loop through items in dir
-        if file.endswith(".zip"):
-            totalfilepath = os.path.join(sourcepath, file)  # get zip file path
-            with zipfile.ZipFile(totalfilepath) as zf:  # open the zip file
-                for item in zf.namelist():  # loop through the list of files to extract
-                    if re.search(rf'{suffix}\Z', str(item)):
-                        filename = file.replace(".zip","") + ".csv" # replace .zip with .csv
-                        filepath = os.path.join(targetpath, filename)  # output path
-                        with open(filepath, "wb") as f:  # open the output path for writing
-                            f.write(zf.read(item))  # save the contents of the file in it
+    zip_paths = [os.path.join(sourcepath, file) for file in os.listdir(sourcepath)
+                 if file.endswith(".zip") and (files is None or file in files)]
+    stats = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(extract_zip, path, targetpath, suffix, chunk_size) for path in zip_paths]
+        for future in as_completed(futures):
+            file, written, seconds = future.result()
+            stats.append((file, written, seconds))
+            print("Extracted {:.1f} MB from {} in {:.2f}s ({:.1f} MB/s)".format(
+                written / 1e6, file, seconds, written / 1e6 / max(seconds, 1e-9)))
+    total_written = sum(written for file, written, seconds in stats)
+    total_seconds = time.perf_counter() - start
+    print("Extracted {:.1f} MB from {} zip files in {:.2f}s ({:.1f} MB/s)".format(
+        total_written / 1e6, len(stats), total_seconds, total_written / 1e6 / max(total_seconds, 1e-9)))
+    return stats
 
 
 def returncaps(string):
@@ -53,14 +86,74 @@ def getlower(string):
                 lowerlist.append(index)
     return lowerlist[0]  
 
-def separate_csv():
-    # function separates csv files created by unzip_files() function into constituent dfs,
+def series_file_name(series_name):
+    # helper function names the separated csv file of a series after the series name, without the
+    # parenthesized units, commas, and spaces (lower case, because upper case in SQL table names is
+    # illegal and the table names are taken from the file names later)
+
+    import re
+
+    csv_name = re.sub(r'(?<=.) \(.+\)','', series_name)
+    csv_name = csv_name.replace(',', '')
+    csv_name = csv_name.replace(' ', '_')
+    return (csv_name + '.csv').lower()
+
+
+def columnar_path(fmt, file):
+    # helper function returns the path of the typed columnar copy of a separated csv file - datasets
+    # are partitioned by indicator ('../data/extracted/parquet/indicator=<table name>/part-0.parquet'),
+    # with the table name and column names create_tables gives the postgres relation
+
+    import os
+
+    extension = {'parquet': 'parquet', 'arrow': 'arrow'}[fmt]
+    return os.path.join("../data/extracted/", fmt, "indicator=" + clean_table_name(file), "part-0." + extension)
+
+
+def write_columnar(writers, fmt, file, df, year_cols):
+    # helper function appends a chunk of a series df to its parquet or arrow IPC file, opening the
+    # writer (kept in writers with its schema) on the first chunk - columns are renamed like the postgres columns
+    # and year columns stored as float64 so every chunk and indicator shares one schema, with missing
+    # values written as NaN rather than nulls so readers can map them into pandas without copying
+
+    import os
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    df = df.copy()
+    df[year_cols] = df[year_cols].apply(pd.to_numeric, errors='coerce').astype('float64')
+    df.columns = [column.replace(' ', '_').lower() for column in df.columns]
+    table = pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None)
+    for column in year_cols:
+        name = column.replace(' ', '_').lower()
+        index = table.schema.get_field_index(name)
+        table = table.set_column(index, name, pc.fill_null(table.column(name), float('nan')))
+
+    key = (fmt, file)
+    if key not in writers:
+        path = columnar_path(fmt, file)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if fmt == 'parquet':
+            writers[key] = (pq.ParquetWriter(path, table.schema), table.schema)
+        else:
+            # uncompressed so readers can memory map the file
+            writers[key] = (pa.ipc.new_file(path, table.schema), table.schema)
+    writer, schema = writers[key]
+    writer.write_table(table.cast(schema))
+
+
+def separate_csv(chunksize=100000, files=None, formats=('csv',)):
+    # function separates csv files created by unzip_files() function into constituent files,
     # each containing data for specific database table, adds country income info,
-    # and exports to csv
+    # and exports to csv - each source file is streamed once in chunks of chunksize rows, so
+    # memory stays bounded however large the World Bank extract is; files limits separation to
+    # the named extracted csv files, and formats adds typed columnar copies of each series
+    # ('parquet' and/or 'arrow' IPC, see columnar_path) alongside the csv files
 
     import os
     import pandas as pd
-    import re
 
     # create directory to deposit separated dfs
     csv_path = "../data/extracted/separated/"
@@ -69,6 +162,10 @@ def separate_csv():
     if os.path.isdir(csv_path) == False:
         os.mkdir(csv_path)
 
+    # load income groups csv into df once, keyed by country code for the merge below
+    income_groups = pd.read_csv(os.path.join(source_path + "income_groups.csv"))
+    income_groups = income_groups[['Code', 'Income Group']]
+
     # create list to store file name acronyms
     file_acros = []
 
@@ -88,145 +185,510 @@ def separate_csv():
             file_acros.append(file_name_acro)
         else:
             file_acros.append(file_name_acro)
-        # for csv files in targetpath folder, read into df, drop metadata (bottom 5 rows),
-        # delete year from year column heading which leaves 'yr____', create list of unique rows from column 2
-        if file.endswith(".csv"):
-            df = pd.read_csv(os.path.join(target_path + file))
-            df = df[:-5]
-            df.drop(labels='Series Code', axis = 1, inplace = True)
-            col_move1 = df.pop("Country Name")
-            df.insert(0, "Country Name", col_move1)
-            col_move2 = df.pop("Country Code")
-            df.insert(0, "Country Code", col_move2)
-            for column in df.columns:
-                if column[0].isnumeric():
-                    df.rename({column:column[6:12]}, axis='columns', inplace=True)
-            df_rows = df.iloc[:,2].unique()
-
-            # load income groups csv into df
-            income_groups = pd.read_csv(os.path.join(source_path + "income_groups.csv"))
-
-            # create a separate df consisting of all rows that share a common unique column 2 value, clean column 2
-            # value entries, write each separate df to the csv_path directory
-            for item in df_rows:
-                grouped_df = df.groupby(df.iloc[:,2])
-                df_new = grouped_df.get_group(item)
-                csv_name = df_new.iloc[0,2]
-                csv_name = re.sub(r'(?<=.) \(.+\)','', csv_name)
-                csv_name = csv_name.replace(',', '')
-                csv_name = csv_name.replace(' ', '_')
-                csv_name = csv_name.replace(',', '')
-                # df_new.iloc[:,2].replace(r'(?<=.) \(.+\)','', regex=True, inplace=True)
-                df_new.iloc[:,2].replace(', ', ' ', regex=True, inplace=True)
-                # df_new.iloc[:,2].replace(' ', '_', regex=True, inplace=True)
-                df_new.iloc[:,1].replace(',', '', regex=True, inplace=True)
-                
-                # Write as optional function call
-                # Transpose the dataframe with the years in the rows and the countries in the columns
-                # df_T = df_new.T
-                # df_T.columns = df_T.iloc[0]
-                # df_T.drop(["Country Name","Series Name", "Country Code"], axis = 0, inplace=True)
-                # df_T.columns.name = None
-                # df_T.reset_index(inplace=True)
-                # df_T.rename(columns= {"index":"Year"}, inplace=True)
-
-                # join df with income_groups.csv df (and drop redundant columns) to link income group to country
-                merged_df = df_new.merge(income_groups, 'inner', left_on = 'Country Code', right_on = 'Code')
-                first_col = merged_df.pop('Income Group')
-                merged_df.insert(1, 'Income Group', first_col)
-                merged_df.drop(['Code', 'Table Name'], axis = 1, inplace = True)    
-
-                # Because upper case in SQL table names is illegal, lowering case of file names
-                # here so that table names can be named after them later
-                # lowerfilename = (os.path.join((file_name_acro + '_' + csv_name + '.csv').lower()))
-                lowerfilename = (os.path.join((csv_name + '.csv').lower()))
-                merged_df.to_csv(os.path.join(csv_path + lowerfilename), index=False)
+        if not file.endswith(".csv") or (files is not None and file not in files):
+            continue
+
+        # open output file of each series the first time it appears in the source file and keep
+        # it open until the whole source file has been streamed
+        outputs = {}
+        columnar_writers = {}
+        try:
+            for df in pd.read_csv(os.path.join(target_path + file), chunksize=chunksize):
+                # drop metadata rows (blank rows and database notes at the bottom of the file have
+                # no country code), delete year from year column heading which leaves 'YR____',
+                # and order columns as country code, country name, series name, years
+                df = df.dropna(subset = ['Country Code'])
+                if df.empty:
+                    # chunk held only notes (its text columns may not even be parsed as strings)
+                    continue
+                df = df.drop(labels = 'Series Code', axis = 1)
+                df = df.rename(columns = {column: column[6:12] for column in df.columns if column[0].isnumeric()})
+                year_cols = [column for column in df.columns if column.startswith('YR')]
+                df = df[['Country Code', 'Country Name', 'Series Name'] + year_cols]
+                # clean series and country name entries
+                df['Series Name'] = df['Series Name'].str.replace(', ', ' ', regex=False)
+                df['Country Name'] = df['Country Name'].str.replace(',', '', regex=False)
+
+                # join df with income groups df (and drop redundant column) to link income group to country
+                df = df.merge(income_groups, 'inner', left_on = 'Country Code', right_on = 'Code')
+                df = df[['Country Code', 'Income Group', 'Country Name', 'Series Name'] + year_cols]
+
+                # append the rows of each series in the chunk to its file, grouping the chunk once
+                for series_name, df_series in df.groupby('Series Name', sort=False):
+                    if series_name not in outputs:
+                        outputs[series_name] = open(os.path.join(csv_path + series_file_name(series_name)), 'w', newline='')
+                        df_series.to_csv(outputs[series_name], index=False)
+                    else:
+                        df_series.to_csv(outputs[series_name], index=False, header=False)
+                    for fmt in formats:
+                        if fmt != 'csv':
+                            write_columnar(columnar_writers, fmt, series_file_name(series_name), df_series, year_cols)
+        finally:
+            for output in outputs.values():
+                output.close()
+            for writer, schema in columnar_writers.values():
+                writer.close()
 
 
 def convertdtypes(list):
     # help function creates a list of sql data types from python counterparts
     sql_types = []
     for item in list:
-        if item == 'float64':
+        if item == 'float64' or item == 'int64':
             sql_types.append('numeric')
         elif item == 'object':
             sql_types.append('text')
     return sql_types
 
 
-def create_tables():
-# function programmatically creates db relation and loads data from csv file into
-# corresponding relation using psycopg2 library
+def db_params():
+    # helper function returns the connection parameters of the postgres database named in the
+    # environmental variables
 
     import os
-    import psycopg2
-    from psycopg2 import sql
-    import pandas as pd
-
-    csv_path = "../data/extracted/separated/"
 
     # Define database connection variables using environmental variables
-    DB_NAME = os.environ.get('DBNM')
-    DB_USER = os.environ.get('DBUS')
-    DB_PASS = os.environ.get('DBPS')
-    DB_HOST = os.environ.get('DBHS')
-    DB_PORT = os.environ.get('DBPT')
+    return {'database': os.environ.get('DBNM'),
+            'user': os.environ.get('DBUS'),
+            'password': os.environ.get('DBPS'),
+            'host': os.environ.get('DBHS'),
+            'port': os.environ.get('DBPT')}
+
+
+def connect_db():
+    # helper function connects to the postgres database named in the environmental variables
+
+    import psycopg2
 
     # connect to database
     try:
-        conn = psycopg2.connect(database=DB_NAME,
-                                user=DB_USER,
-                                password=DB_PASS,
-                                host=DB_HOST,
-                                port=DB_PORT)
+        conn = psycopg2.connect(**db_params())
         print("Database connected successfully")
     except:
         print("Database not connected successfully")
-    cur = conn.cursor() # create a cursor
+        raise
+    return conn
 
-    prec = 2 # define precision of postgres numerical type 
 
-    # iterate through each file in path of separated csv files
-    for file in os.listdir(csv_path):
-        # clean the filenames so they can be used as sql table names
-        file_name = file.replace('.csv','')
-        file_name = file_name.replace('.','')
-        file_name = file_name.replace('$','')
-        file_name = file_name.replace('%','')
+def clean_table_name(file):
+    # helper function cleans a separated csv filename so it can be used as a sql table name
+    file_name = file.replace('.csv','')
+    file_name = file_name.replace('.','')
+    file_name = file_name.replace('$','')
+    file_name = file_name.replace('%','')
+    return file_name
+
+
+def table_columns(csv_path, file):
+    # helper function returns the cleaned column names, sql data types, and row count of a
+    # separated csv file - read from the metadata of its parquet copy when separate_csv wrote one,
+    # which avoids parsing the csv text before postgres parses it again in COPY
+
+    import os
+    import pandas as pd
+
+    parquet_path = columnar_path('parquet', file)
+    if os.path.isfile(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(os.path.join(csv_path, file)):
+        import pyarrow.parquet as pq
 
-        # read file as df, read and clean column names and data types (translated into sql data types)
+        parquet_file = pq.ParquetFile(parquet_path)
+        df = parquet_file.schema_arrow.empty_table().to_pandas()
+        rows = parquet_file.metadata.num_rows
+    else:
         df = pd.read_csv(os.path.join(csv_path, file))
-        col_list = df.columns
-        col_list = [item.replace(' ', '_') for item in col_list]
-        col_list = [item.lower() for item in col_list]
-        dtypes_list = df.dtypes
-        sql_types = convertdtypes(dtypes_list)
-
-        # create list containing cleaned file name, column names, and sql data types
-        sql_col_list = []
-        for index, column in enumerate(col_list):
-            sql_col_list.append([file_name, col_list[index], sql_types[index]])
-
-        # create a sql table named after csv file, with first df column as primary key
-        # query_create = sql.SQL("CREATE TABLE {table} ({field} {type} PRIMARY KEY)") # create column with df column name and data type
-        # cur.execute(query_create.format(table = sql.Identifier(sql_col_list[0][0]), field = sql.Identifier(sql_col_list[0][1]), type = sql.Identifier(sql_col_list[0][2])))
-        # conn.commit()
-        query_create = sql.SQL("CREATE TABLE {table} ({field} {type} PRIMARY KEY)")
-        cur.execute(query_create.format(table = sql.Identifier(sql_col_list[0][0]), field = sql.Identifier(sql_col_list[0][1]), type = sql.Identifier(sql_col_list[0][2])))
-        conn.commit()    
-
-        # add every other column in df
-        for index in range(len(col_list) - 1): # for every other column except for first
-            query_add = sql.SQL("alter table {table} add {field} {type}") # create column with df column name and data type
-            cur.execute(query_add.format(table = sql.Identifier(sql_col_list[index+1][0]), field = sql.Identifier(sql_col_list[index+1][1]), type = sql.Identifier(sql_col_list[index+1][2])))
-            conn.commit()       
-
-        # load in data from corresponding csv
-        with open(os.path.join(csv_path, file), 'r') as f:
-            next(f)
-            cur.copy_from(f, file_name, sep=',', null='')
+        rows = len(df)
+    col_list = [item.replace(' ', '_').lower() for item in df.columns]
+    return col_list, convertdtypes(df.dtypes), rows
+
+
+# schema new copies of the indicator tables are loaded into before they replace the current ones
+STAGING_SCHEMA = 'staging'
+
+
+def load_table(db_pool, csv_path, file):
+    # helper function creates the relation of one separated csv file in the staging schema with a
+    # single CREATE TABLE statement and loads the csv into it with COPY on a pooled connection (run
+    # concurrently by create_tables) - returns the table name, rows in the csv, and seconds taken
+
+    import os
+    import time
+    from psycopg2 import sql
+
+    start = time.perf_counter()
+
+    # clean the filenames so they can be used as sql table names
+    file_name = clean_table_name(file)
+
+    # read and clean column names and data types (translated into sql data types)
+    col_list, sql_types, rows = table_columns(csv_path, file)
+
+    # create a sql table named after csv file, with first df column as primary key and every
+    # other column in df after it
+    columns = [sql.SQL("{field} {type} PRIMARY KEY").format(field = sql.Identifier(col_list[0]), type = sql.SQL(sql_types[0]))]
+    for column, sql_type in zip(col_list[1:], sql_types[1:]):
+        columns.append(sql.SQL("{field} {type}").format(field = sql.Identifier(column), type = sql.SQL(sql_type)))
+    # the new copy of the table is built in the staging schema and swapped in by create_tables
+    # once every staged table has been validated, so the dashboard never reads a missing or
+    # partly loaded table
+    query_create = sql.SQL("CREATE TABLE {table} ({columns})").format(
+        table = sql.Identifier(STAGING_SCHEMA, file_name), columns = sql.SQL(', ').join(columns))
+
+    conn = db_pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("DROP TABLE IF EXISTS {table}").format(table = sql.Identifier(STAGING_SCHEMA, file_name)))
+            cur.execute(query_create)
+            # load in data from corresponding csv (skipping the header row)
+            query_copy = sql.SQL("COPY {table} FROM STDIN WITH (FORMAT csv, HEADER true)").format(
+                table = sql.Identifier(STAGING_SCHEMA, file_name))
+            with open(os.path.join(csv_path, file), 'r') as f:
+                cur.copy_expert(query_copy, f)
+        conn.commit()
+    except:
+        conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn)
+    return file_name, rows, time.perf_counter() - start
+
+
+def swap_tables(conn, loaded):
+    # helper function validates the staged tables (every csv row loaded, no empty tables) and moves
+    # them into the public schema in one transaction, replacing the current tables and recording
+    # their load time, so the dashboard switches from the old set of tables to the new one at once
+    # (the pages notice the new load times and drop their cached copies)
+
+    from psycopg2 import sql
+
+    with conn.cursor() as cur:
+        for table, rows in loaded.items():
+            cur.execute(sql.SQL("SELECT count(*) FROM {table}").format(table = sql.Identifier(STAGING_SCHEMA, table)))
+            staged_rows = cur.fetchone()[0]
+            if staged_rows == 0 or staged_rows != rows:
+                raise ValueError("Staged table {} has {} rows, expected {}".format(table, staged_rows, rows))
+
+        query_version = sql.SQL("INSERT INTO etl_table_versions (table_name, loaded_at) VALUES (%s, now()) "
+                                "ON CONFLICT (table_name) DO UPDATE SET loaded_at = EXCLUDED.loaded_at")
+        try:
+            for table in loaded:
+                cur.execute(sql.SQL("DROP TABLE IF EXISTS {table}").format(table = sql.Identifier('public', table)))
+                cur.execute(sql.SQL("ALTER TABLE {table} SET SCHEMA public").format(table = sql.Identifier(STAGING_SCHEMA, table)))
+                cur.execute(query_version, (table,))
             conn.commit()
+        except:
+            conn.rollback()
+            raise
+
+
+def create_tables(workers=8, files=None):
+# function programmatically creates db relation and loads data from csv file into
+# corresponding relation using psycopg2 library - tables are loaded concurrently by workers
+# threads, each on its own connection from a pool, into the staging schema, then validated and
+# swapped in for the current tables in one transaction; files limits loading to the named
+# separated csv files
+
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    import os
+    import time
+    from psycopg2 import pool, sql
+
+    csv_path = "../data/extracted/separated/"
+
+    conn = connect_db() # connect to database
+    cur = conn.cursor() # create a cursor
+
+    # create relation recording when each table was last loaded - the dashboard pages check it
+    # to drop cached copies of reloaded tables - and the schema tables are staged in
+    cur.execute("CREATE TABLE IF NOT EXISTS etl_table_versions (table_name text PRIMARY KEY, loaded_at timestamptz NOT NULL)")
+    cur.execute(sql.SQL("CREATE SCHEMA IF NOT EXISTS {schema}").format(schema = sql.Identifier(STAGING_SCHEMA)))
+    conn.commit()
+    cur.close()
+
+    # load every file in path of separated csv files into the staging schema on a pool of connections
+    files = [file for file in os.listdir(csv_path) if file.endswith(".csv") and (files is None or file in files)]
+    loaded = {}
+    start = time.perf_counter()
+    db_pool = pool.ThreadedConnectionPool(1, workers, **db_params())
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(load_table, db_pool, csv_path, file) for file in files]
+            for future in as_completed(futures):
+                table, rows, seconds = future.result()
+                loaded[table] = rows
+                print("Staged {} rows into {} in {:.2f}s".format(rows, table, seconds))
+    finally:
+        db_pool.closeall()
+
+    # validate the staged tables and swap them in
+    try:
+        swap_tables(conn, loaded)
+    finally:
+        conn.close()
+    print("Loaded {} tables in {:.2f}s".format(len(loaded), time.perf_counter() - start))
+
+
+def summarize_indicator(df, indicator):
+    # helper function calculates the median, mean, quartiles and count of the values of every
+    # income group in every year of a separated csv df, returned in long format
+    year_cols = [column for column in df.columns if column.upper().startswith('YR')]
+    long_df = df.melt(id_vars = ['Income Group'], value_vars = year_cols, var_name = 'year', value_name = 'value')
+    long_df['year'] = long_df['year'].str[2:].astype(int)
+    grouped = long_df.groupby(['Income Group', 'year'])['value']
+    summary = grouped.agg(['median', 'mean', 'count'])
+    quartiles = grouped.quantile([0.25, 0.75]).unstack()
+    quartiles.columns = ['q25', 'q75']
+    summary = summary.join(quartiles).reset_index()
+    summary.insert(0, 'indicator', indicator)
+    return summary[['indicator', 'Income Group', 'year', 'median', 'mean', 'q25', 'q75', 'count']].rename(columns = {'count': 'n_countries'})
+
+
+def create_summary_table():
+# function calculates per-indicator, per-income group, per-year summary statistics from the
+# separated csv files and loads them into the indicator_summary relation, which the line
+# graphs on the dashboard pages read instead of aggregating each indicator table on every callback
+
+    import io
+    import os
+    import pandas as pd
+
+    csv_path = "../data/extracted/separated/"
+
+    conn = connect_db() # connect to database
+    cur = conn.cursor() # create a cursor
+
+    # summarize every separated csv file under the table name create_tables() gives it
+    summaries = []
+    for file in os.listdir(csv_path):
+        if file.endswith(".csv"):
+            df = pd.read_csv(os.path.join(csv_path, file))
+            summaries.append(summarize_indicator(df, clean_table_name(file)))
+    summary = pd.concat(summaries)
+
+    # recreate the summary relation and load it from an in-memory csv in one transaction
+    cur.execute("DROP TABLE IF EXISTS indicator_summary")
+    cur.execute("CREATE TABLE indicator_summary (indicator text, income_group text, year integer, "
+                "median numeric, mean numeric, q25 numeric, q75 numeric, n_countries integer, "
+                "PRIMARY KEY (indicator, income_group, year))")
+    buffer = io.StringIO()
+    summary.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cur.copy_from(buffer, 'indicator_summary', sep=',', null='')
+
+    # record load time of the relation so running dashboards invalidate their cached medians
+    cur.execute("CREATE TABLE IF NOT EXISTS etl_table_versions (table_name text PRIMARY KEY, loaded_at timestamptz NOT NULL)")
+    cur.execute("INSERT INTO etl_table_versions (table_name, loaded_at) VALUES ('indicator_summary', now()) "
+                "ON CONFLICT (table_name) DO UPDATE SET loaded_at = EXCLUDED.loaded_at")
+    conn.commit()
 
     # close cursor and connection
     cur.close()
-    conn.close()
\ No newline at end of file
+    conn.close()
+
+def create_long_tables():
+# function loads every separated csv file into a single long-format fact relation
+# (indicator_values: indicator, country_code, year, value) plus a countries dimension relation,
+# as an alternative to the one-wide-table-per-indicator layout of create_tables() - the pages
+# read it when started with DATA_LAYOUT=long
+
+    import io
+    import os
+    import pandas as pd
+
+    csv_path = "../data/extracted/separated/"
+
+    conn = connect_db() # connect to database
+    cur = conn.cursor() # create a cursor
+
+    # melt every separated csv file into (indicator, country_code, year, value) rows, leaving out
+    # missing values, and collect the country names and income groups they contain
+    values = []
+    countries = []
+    indicators = []
+    for file in os.listdir(csv_path):
+        if file.endswith(".csv"):
+            df = pd.read_csv(os.path.join(csv_path, file))
+            indicator = clean_table_name(file)
+            indicators.append(indicator)
+            year_cols = [column for column in df.columns if column.upper().startswith('YR')]
+            long_df = df.melt(id_vars = ['Country Code'], value_vars = year_cols, var_name = 'year', value_name = 'value')
+            long_df = long_df.dropna(subset = ['value'])
+            long_df['year'] = long_df['year'].str[2:].astype(int)
+            long_df.insert(0, 'indicator', indicator)
+            values.append(long_df)
+            countries.append(df[['Country Code', 'Country Name', 'Income Group']])
+    values = pd.concat(values)
+    countries = pd.concat(countries).drop_duplicates(subset = ['Country Code'])
+
+    # recreate both relations - the primary key leads with (indicator, year) so a page's query for
+    # one indicator over a year range only scans the matching rows
+    cur.execute("DROP TABLE IF EXISTS indicator_values")
+    cur.execute("DROP TABLE IF EXISTS countries")
+    cur.execute("CREATE TABLE countries (country_code text PRIMARY KEY, country_name text, income_group text)")
+    cur.execute("CREATE INDEX countries_income_group_idx ON countries (income_group)")
+    cur.execute("CREATE TABLE indicator_values (indicator text, country_code text REFERENCES countries, "
+                "year smallint, value double precision, PRIMARY KEY (indicator, year, country_code))")
+
+    # load both relations from in-memory csvs (csv format, since country names may contain commas)
+    for table, df in (('countries', countries), ('indicator_values', values)):
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cur.copy_expert("COPY {} FROM STDIN WITH (FORMAT csv)".format(table), buffer)
+
+    # record load time of every indicator so running dashboards invalidate their cached copies
+    cur.execute("CREATE TABLE IF NOT EXISTS etl_table_versions (table_name text PRIMARY KEY, loaded_at timestamptz NOT NULL)")
+    for indicator in indicators + ['indicator_values']:
+        cur.execute("INSERT INTO etl_table_versions (table_name, loaded_at) VALUES (%s, now()) "
+                    "ON CONFLICT (table_name) DO UPDATE SET loaded_at = EXCLUDED.loaded_at", (indicator,))
+    conn.commit()
+
+    # close cursor and connection
+    cur.close()
+    conn.close()
+
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    # helper function returns the sha256 hex digest of a file's bytes, read in chunks
+
+    import hashlib
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def directory_hashes(path, suffix):
+    # helper function returns {file name: sha256} of the files in path ending in suffix
+
+    import os
+
+    return {file: file_hash(os.path.join(path, file)) for file in sorted(os.listdir(path)) if file.endswith(suffix)}
+
+
+def read_manifest(manifest_path):
+    # helper function reads the ETL manifest - the content hashes of the zips, extracted csvs, and
+    # separated csvs seen by the last run, and of the separated csv each table was loaded from
+
+    import json
+    import os
+
+    manifest = {'zips': {}, 'extracted': {}, 'separated': {}, 'loaded': {}}
+    if os.path.isfile(manifest_path):
+        with open(manifest_path) as f:
+            manifest.update(json.load(f))
+    return manifest
+
+
+def write_manifest(manifest, manifest_path):
+    # helper function writes the ETL manifest through a temporary file so an interrupted run never
+    # leaves a truncated manifest
+
+    import json
+    import os
+
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+
+def record_step(timings, step, start):
+# helper function records the seconds since start as the duration of an ETL step, prints it, and
+# with METRICS_LOG=1 prints it as a json line too (structured log) - returns the current time so
+# consecutive steps can be chained
+
+    import json
+    import os
+    import time
+
+    now = time.perf_counter()
+    timings[step] = round(now - start, 3)
+    print("ETL step {} took {:.2f}s".format(step, now - start))
+    if os.environ.get('METRICS_LOG', '0') == '1':
+        print(json.dumps({'metric': 'etl_step', 'step': step, 'seconds': timings[step], 'time': time.time()}), flush=True)
+    return now
+
+
+def write_etl_metrics(timings, metrics_path, keep=50):
+# helper function appends the step timings of one ETL run to data/etl_metrics.json (read by the
+# app's /metrics endpoint), keeping the last keep runs
+
+    import json
+    import os
+    import time
+
+    try:
+        with open(metrics_path) as f:
+            runs = json.load(f)
+    except (OSError, ValueError):
+        runs = []
+    runs.append({'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'steps': timings,
+                 'total': round(sum(timings.values()), 3)})
+    with open(metrics_path + '.tmp', 'w') as f:
+        json.dump(runs[-keep:], f, indent=1)
+    os.replace(metrics_path + '.tmp', metrics_path)
+
+
+def run_etl(force=False, long_layout=False, formats=('csv',)):
+# function runs the whole ETL incrementally - content hashes of the zips, extracted csvs, and
+# separated csvs are kept in data/etl_manifest.json, so a rerun only extracts zips, separates
+# csvs, and reloads tables whose source bytes changed since the last run (everything when force
+# is True); the summary relation (and the long-format relations if long_layout is True) are
+# rebuilt when any table was reloaded, and formats is passed on to separate_csv - the duration
+# of each step is printed and kept in data/etl_metrics.json
+
+    import os
+    import time
+
+    sourcepath = "../data/"
+    targetpath = "../data/extracted/"
+    csv_path = "../data/extracted/separated/"
+    manifest_path = "../data/etl_manifest.json"
+    metrics_path = "../data/etl_metrics.json"
+
+    timings = {}
+    start = time.perf_counter()
+    manifest = read_manifest(manifest_path)
+
+    # extract zips that changed, or whose extracted csv is missing
+    zips = directory_hashes(sourcepath, ".zip")
+    changed_zips = [file for file, digest in zips.items()
+                    if force or manifest['zips'].get(file) != digest
+                    or not os.path.isfile(os.path.join(targetpath, file.replace(".zip", "") + ".csv"))]
+    if changed_zips:
+        unzip_files(files=changed_zips)
+    manifest['zips'] = zips
+    write_manifest(manifest, manifest_path)
+    start = record_step(timings, 'unzip', start)
+
+    # separate extracted csvs that changed
+    extracted = directory_hashes(targetpath, ".csv")
+    changed_extracted = [file for file, digest in extracted.items() if force or manifest['extracted'].get(file) != digest]
+    if changed_extracted:
+        separate_csv(files=changed_extracted, formats=formats)
+    manifest['extracted'] = extracted
+    write_manifest(manifest, manifest_path)
+    start = record_step(timings, 'separate', start)
+
+    # reload tables whose separated csv differs from the one they were loaded from
+    separated = directory_hashes(csv_path, ".csv")
+    changed_separated = [file for file, digest in separated.items() if force or manifest['loaded'].get(file) != digest]
+    manifest['separated'] = separated
+    if changed_separated:
+        create_tables(files=changed_separated)
+        for file in changed_separated:
+            manifest['loaded'][file] = separated[file]
+        write_manifest(manifest, manifest_path)
+        start = record_step(timings, 'load', start)
+        create_summary_table()
+        start = record_step(timings, 'summary', start)
+        if long_layout:
+            create_long_tables()
+            start = record_step(timings, 'long_tables', start)
+    else:
+        write_manifest(manifest, manifest_path)
+    write_etl_metrics(timings, metrics_path)
+    print("Extracted {} zip files, separated {} csv files, reloaded {} tables".format(
+        len(changed_zips), len(changed_extracted), len(changed_separated)))
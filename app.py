@@ -19,3 +19,11 @@ app = dash.Dash(__name__,
 app.title = "Economics of International Food Insecurity"
 
 server = app.server
+
+# compress responses, and send assets with cache headers (and precompressed, see utils/http.py)
+from utils.http import configure_server
+configure_server(app)
+
+# serve the per-callback and per-stage timings as json (see utils/metrics.py)
+from utils.metrics import register_metrics_endpoint
+register_metrics_endpoint(server)
@@ -0,0 +1,35 @@
+// clientside callbacks for year slider scrubbing (enabled with CLIENTSIDE_SCRUB=1, see utils/scrub.py)
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    scrub: {
+        // swap the selected year's values into the choropleth and violin plot templates in the store
+        update_year: function(year, data) {
+            if (!data) {
+                return [window.dash_clientside.no_update, window.dash_clientside.no_update];
+            }
+            var values = data.values[String(year)];
+
+            // choropleth keeps its locations and hover text, only z changes
+            var choropleth = {
+                data: [Object.assign({}, data.choropleth.data[0], {z: values})],
+                layout: data.choropleth.layout
+            };
+
+            // violin plot has one trace per income group, named after the group
+            var violin = {
+                data: data.violin.data.map(function(trace) {
+                    var x = [], y = [], customdata = [];
+                    data.groups.forEach(function(group, i) {
+                        if (group === trace.name) {
+                            x.push(values[i]);
+                            y.push(group);
+                            customdata.push([data.names[i]]);
+                        }
+                    });
+                    return Object.assign({}, trace, {x: x, y: y, customdata: customdata});
+                }),
+                layout: data.violin.layout
+            };
+            return [choropleth, violin];
+        }
+    }
+});
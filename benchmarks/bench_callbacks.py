@@ -0,0 +1,138 @@
+# benchmark of the page callbacks - drives each page's figure functions over its whole input space
+# (every indicator, income group, and year) and reports latency percentiles, the time spent in
+# each stage (see utils/metrics.py), and memory
+#
+#   python -m benchmarks.bench_callbacks                      # file-backed data built from data/extracted/separated
+#   python -m benchmarks.bench_callbacks --source postgres    # the database in the DBNM, ... variables
+#   python -m benchmarks.bench_callbacks --mode cached --cold
+#
+# --mode render (default) renders and serializes every figure, bypassing the figure cache, and
+# --mode cached calls update_figure through the figure cache twice (misses, then hits); --cold
+# drops the cached indicator tables before every call so each one pays for the data source read
+import argparse
+import json
+import os
+import time
+
+from benchmarks.common import ROOT, latency_summary, load_etl, measure_memory, print_table, workspace
+
+# separated csv files the file-backed data is built from
+SEPARATED_PATH = os.path.join(ROOT, 'data', 'extracted', 'separated')
+
+
+def build_arrow_data(etl, data_dir, separated_path=SEPARATED_PATH):
+    # helper function writes an arrow IPC copy of every separated csv file into the scratch data
+    # directory (the layout separate_csv(formats=('arrow',)) writes) and returns its extracted/ path
+    import pandas as pd
+
+    writers = {}
+    try:
+        for file in sorted(os.listdir(separated_path)):
+            if file.endswith('.csv'):
+                df = pd.read_csv(os.path.join(separated_path, file))
+                year_cols = [column for column in df.columns if column.startswith('YR')]
+                etl.write_columnar(writers, 'arrow', file, df, year_cols)
+    finally:
+        for writer, schema in writers.values():
+            writer.close()
+    return os.path.join(data_dir, 'extracted')
+
+
+def call_inputs(page):
+    # helper function returns every (function name, function, indicator, other inputs) call of a page
+    calls = []
+    for indicator in page.indicator_dict:
+        calls.append(('update_line_figure', page.update_line_figure, indicator['value'], ()))
+        for income in page.income_dict:
+            for year in page.new_cols:
+                calls.append(('update_map_figures', page.update_map_figures, indicator['value'], (income['value'], year)))
+    return calls
+
+
+def render(func, indicator, args):
+    # helper function renders and serializes the figures of one call without the figure cache
+    from utils.figure_templates import figure_json
+    from utils.metrics import metrics
+
+    result = func.__wrapped__(indicator, *args)
+    if not isinstance(result, tuple):
+        result = (result,)
+    with metrics.stage('serialize'):
+        return [figure_json(fig) for fig in result]
+
+
+def bench_page(page, mode, cold):
+    # helper function runs every call of a page, returning a latency row per function and pass
+    from utils.cache import table_cache
+    from utils.bundle import page_name
+    from utils.figure_cache import figure_cache
+    from utils.metrics import metrics
+
+    name = page_name(page.__name__)
+    passes = ['render'] if mode == 'render' else ['miss', 'hit']
+    figure_cache.invalidate()
+    rows = []
+    for run in passes:
+        samples = {}
+        memory = {}
+        with measure_memory(memory):
+            for func_name, func, indicator, args in call_inputs(page):
+                if cold:
+                    table_cache.invalidate()
+                start = time.perf_counter()
+                if mode == 'render':
+                    with metrics.callback(name + '.' + func_name, indicator):
+                        render(func, indicator, args)
+                else:
+                    func(indicator, *args)
+                samples.setdefault(func_name, []).append(time.perf_counter() - start)
+        for func_name, values in samples.items():
+            rows.append(dict(latency_summary(values), page = name, function = func_name, run = run, **memory))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark the page figure functions over their whole input space")
+    parser.add_argument('--source', choices = ['arrow', 'postgres'], default = 'arrow', help = "data source the pages read")
+    parser.add_argument('--arrow-data', help = "directory holding arrow/indicator=<table>/part-0.arrow (built from "
+                                               "data/extracted/separated if not given)")
+    parser.add_argument('--mode', choices = ['render', 'cached'], default = 'render')
+    parser.add_argument('--cold', action = 'store_true', help = "drop the cached indicator tables before every call")
+    parser.add_argument('--pages', nargs = '+', default = ['page1b', 'page2b', 'page3'])
+    parser.add_argument('--json', help = "also write the results to this json file")
+    args = parser.parse_args()
+
+    with workspace() as data_dir:
+        # the data source is chosen when utils.indicators is imported, so the environment is set first
+        os.environ['DATA_SOURCE'] = args.source
+        os.environ.pop('FIGURE_BUNDLE', None)
+        if args.source == 'arrow':
+            os.environ['ARROW_DATA'] = args.arrow_data or build_arrow_data(load_etl(), data_dir)
+
+        import importlib
+        from utils.metrics import metrics
+
+        rows = []
+        errors = []
+        for page_module in args.pages:
+            page = importlib.import_module('pages.' + page_module)
+            try:
+                rows.extend(bench_page(page, args.mode, args.cold))
+            except Exception as e:
+                errors.append((page_module, e))
+
+    print()
+    print_table(rows, ['page', 'function', 'run', 'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms',
+                       'peak_alloc_mb', 'rss_growth_mb'])
+    print()
+    stages = [row for row in metrics.summary() if row['indicator'] is None and row['callback'] != 'startup']
+    print_table(stages, ['callback', 'stage', 'count', 'mean_ms', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms'])
+    for page_module, e in errors:
+        print("{} failed: {!r}".format(page_module, e))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'calls': rows, 'stages': stages}, f, indent = 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+# benchmark of the ETL steps (unzip_files, separate_csv, create_tables) on the bundled World Bank
+# extract and on synthetically scaled copies of it - every run works on a scratch copy of data/,
+# so the repo's extracted files are never touched
+#
+#   python -m benchmarks.bench_etl --scales 1 10 100 --dimension countries
+#   python -m benchmarks.bench_etl --scales 10 --dimension series --formats csv arrow --postgres
+#
+# create_tables only runs with --postgres, against the database named in the DBNM, DBUS, DBPS,
+# DBHS, and DBPT environmental variables (use a local scratch database - the benchmarked
+# indicator tables replace the ones in it)
+import argparse
+import io
+import json
+import os
+import resource
+import zipfile
+
+import pandas as pd
+
+from benchmarks.common import ROOT, load_etl, measure_memory, print_table, timed, workspace
+
+# bundled extract and income groups the scaled copies are generated from
+SOURCE_DATA = os.path.join(ROOT, 'data')
+
+
+def source_extract(data_path=SOURCE_DATA):
+    # helper function returns the data csv member name and contents (every value as text) of the
+    # first World Bank zip in data_path
+    for file in sorted(os.listdir(data_path)):
+        if file.endswith('.zip'):
+            with zipfile.ZipFile(os.path.join(data_path, file)) as zf:
+                member = next(name for name in zf.namelist() if name.endswith('_Data.csv'))
+                with zf.open(member) as f:
+                    df = pd.read_csv(f, dtype = str, keep_default_na = False, encoding = 'utf-8-sig')
+            return member, df
+    raise FileNotFoundError("No World Bank zip file in {}".format(data_path))
+
+
+def scale_extract(df, income_groups, countries=1, series=1):
+    # helper function returns the extract and income groups with countries copies of every country
+    # (new country codes, same income group) and series copies of every series (new series names,
+    # which separate_csv turns into new indicator tables) - the database notes at the bottom of the
+    # extract stay at the bottom
+    data = df.loc[df['Country Code'] != '']
+    notes = df.loc[df['Country Code'] == '']
+
+    copies = [data]
+    group_copies = [income_groups]
+    for copy in range(2, countries + 1):
+        df_copy = data.copy()
+        df_copy['Country Code'] = df_copy['Country Code'] + str(copy)
+        df_copy['Country Name'] = df_copy['Country Name'] + ' ' + str(copy)
+        copies.append(df_copy)
+        groups_copy = income_groups.copy()
+        groups_copy['Code'] = groups_copy['Code'] + str(copy)
+        group_copies.append(groups_copy)
+    data = pd.concat(copies, ignore_index = True)
+
+    copies = [data]
+    for copy in range(2, series + 1):
+        df_copy = data.copy()
+        # the suffix goes before the parenthesized units, which series_file_name drops
+        df_copy['Series Name'] = df_copy['Series Name'].str.replace(r'^([^(]*?)( \(|$)', r'\1 v{}\2'.format(copy), n = 1, regex = True)
+        df_copy['Series Code'] = df_copy['Series Code'] + '.V' + str(copy)
+        copies.append(df_copy)
+    return pd.concat(copies + [notes], ignore_index = True), pd.concat(group_copies, ignore_index = True)
+
+
+def write_extract(data_dir, member, df, income_groups):
+    # helper function writes a scaled extract as a World Bank zip, and its income groups csv, into data_dir
+    buffer = io.StringIO()
+    df.to_csv(buffer, index = False)
+    zip_path = os.path.join(data_dir, 'P_Data_Extract_From_World_Development_Indicators.zip')
+    with zipfile.ZipFile(zip_path, 'w', compression = zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(member, buffer.getvalue())
+    income_groups.to_csv(os.path.join(data_dir, 'income_groups.csv'), index = False)
+    return os.path.getsize(zip_path), len(buffer.getvalue())
+
+
+def children_max_rss_mb():
+    # helper function returns the peak resident memory of any finished child process (the unzip workers) in MB
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1e3
+
+
+def bench_scale(etl, member, df, income_groups, countries, series, formats, postgres, keep):
+    # helper function runs the ETL steps on one scaled copy of the extract, returning a result row per step
+    scaled, scaled_groups = scale_extract(df, income_groups, countries, series)
+    rows = []
+    with workspace(keep) as data_dir:
+        zip_bytes, csv_bytes = write_extract(data_dir, member, scaled, scaled_groups)
+        label = {'countries': countries, 'series': series, 'rows': len(scaled), 'csv_mb': csv_bytes / 1e6}
+        steps = [('unzip_files', lambda: etl.unzip_files()),
+                 ('separate_csv', lambda: etl.separate_csv(formats = tuple(formats)))]
+        if postgres:
+            steps.append(('create_tables', lambda: etl.create_tables()))
+        for step, run in steps:
+            result = dict(label, step = step)
+            with measure_memory(result), timed(result):
+                run()
+            result['mb_per_s'] = csv_bytes / 1e6 / max(result['seconds'], 1e-9)
+            result['children_max_rss_mb'] = children_max_rss_mb()
+            rows.append(result)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark the ETL steps on scaled copies of the bundled extract")
+    parser.add_argument('--scales', type = int, nargs = '+', default = [1, 10], help = "scale factors to run (1 is the bundled extract)")
+    parser.add_argument('--dimension', choices = ['countries', 'series', 'both'], default = 'countries',
+                        help = "what the scale factor multiplies")
+    parser.add_argument('--formats', nargs = '+', default = ['csv'], help = "formats written by separate_csv (csv, parquet, arrow)")
+    parser.add_argument('--postgres', action = 'store_true', help = "also benchmark create_tables against the DBNM database")
+    parser.add_argument('--keep', action = 'store_true', help = "keep the scratch workspaces")
+    parser.add_argument('--json', help = "also write the results to this json file")
+    args = parser.parse_args()
+
+    etl = load_etl()
+    member, df = source_extract()
+    income_groups = pd.read_csv(os.path.join(SOURCE_DATA, 'income_groups.csv'), dtype = str, keep_default_na = False)
+
+    rows = []
+    for scale in args.scales:
+        countries = scale if args.dimension in ('countries', 'both') else 1
+        series = scale if args.dimension in ('series', 'both') else 1
+        rows.extend(bench_scale(etl, member, df, income_groups, countries, series, args.formats, args.postgres, args.keep))
+
+    print()
+    print_table(rows, ['step', 'countries', 'series', 'rows', 'csv_mb', 'seconds', 'mb_per_s',
+                       'peak_alloc_mb', 'rss_growth_mb', 'children_max_rss_mb'])
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent = 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+# shared helpers of the benchmark scripts - latency summaries, memory readings, and scratch copies
+# of the repo's data directory laid out the way ETL/load_data.py expects ('../data/' seen from ETL/)
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import psutil
+
+# repo root and the ETL module path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ETL_PATH = os.path.join(ROOT, 'ETL', 'load_data.py')
+
+# percentiles reported for every benchmark
+PERCENTILES = (50, 95, 99)
+
+
+def load_etl():
+    # helper function imports ETL/load_data.py (a script directory, not a package)
+    spec = importlib.util.spec_from_file_location('load_data', ETL_PATH)
+    module = importlib.util.module_from_spec(spec)
+    # registered before running it so the process pool in unzip_files can pickle its functions
+    sys.modules['load_data'] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def latency_summary(samples):
+    # helper function returns the count, mean, max, and percentiles of a list of durations in seconds (as ms)
+    from utils.metrics import percentile
+
+    samples = sorted(samples)
+    if not samples:
+        return {'count': 0}
+    summary = {'count': len(samples), 'mean_ms': sum(samples) / len(samples) * 1000, 'max_ms': samples[-1] * 1000}
+    for q in PERCENTILES:
+        summary['p{}_ms'.format(q)] = percentile(samples, q) * 1000
+    return summary
+
+
+def rss_mb():
+    # helper function returns the resident memory of this process in MB
+    return psutil.Process().memory_info().rss / 1e6
+
+
+@contextmanager
+def measure_memory(result):
+    # context manager stores the python allocation peak (tracemalloc) and resident memory growth of
+    # the block in the result dict, in MB
+    rss_start = rss_mb()
+    tracemalloc.start()
+    try:
+        yield result
+    finally:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result['peak_alloc_mb'] = peak / 1e6
+        result['rss_growth_mb'] = rss_mb() - rss_start
+
+
+@contextmanager
+def timed(result, key='seconds'):
+    # context manager stores the wall time of the block in the result dict
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result[key] = time.perf_counter() - start
+
+
+@contextmanager
+def workspace(keep=False):
+    # context manager creates a scratch directory with ETL/ and data/ subdirectories, runs the block
+    # inside its ETL/ directory (so the ETL's '../data/' paths point at the scratch data), and
+    # removes it afterwards unless keep is True - yields the scratch data directory
+    root = tempfile.mkdtemp(prefix = 'wb_devindex_bench_')
+    os.makedirs(os.path.join(root, 'ETL'))
+    os.makedirs(os.path.join(root, 'data'))
+    cwd = os.getcwd()
+    os.chdir(os.path.join(root, 'ETL'))
+    try:
+        yield os.path.join(root, 'data')
+    finally:
+        os.chdir(cwd)
+        if keep:
+            print("Kept benchmark workspace {}".format(root))
+        else:
+            shutil.rmtree(root, ignore_errors = True)
+
+
+def print_table(rows, columns):
+    # helper function prints a list of result dicts as an aligned text table
+    widths = [max([len(column)] + [len(format_value(row.get(column))) for row in rows]) for column in columns]
+    print('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(format_value(row.get(column)).ljust(width) for column, width in zip(columns, widths)))
+
+
+def format_value(value):
+    # helper function formats a result value for print_table
+    if isinstance(value, float):
+        return '{:.2f}'.format(value)
+    return '' if value is None else str(value)
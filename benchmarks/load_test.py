@@ -0,0 +1,245 @@
+# load generator replaying dashboard sessions against the flask server - every simulated user
+# opens one of the indicator pages and then mostly scrubs the year slider, now and then changing
+# the income group or indicator, by posting the _dash-update-component payloads the browser sends
+#
+#   python -m benchmarks.load_test --users 20 --duration 30                  # in-process (app.server test client)
+#   python -m benchmarks.load_test --url http://127.0.0.1:8050 --users 50    # a running server
+#   python -m benchmarks.load_test --gunicorn 1x1 4x1 4x4 --users 50         # gunicorn workers x threads
+#
+# throughput and latency percentiles are reported per route, callback, and server configuration
+import argparse
+import importlib
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import ROOT, latency_summary, print_table
+
+# page module and (choropleth, violin plot, line graph) ids of every indicator page route
+ROUTES = {
+    '/inflation': ('page1b', 'imports_choropleth1', 'imports_histogram1', 'imports_line1', 'imports_figure_stamp1'),
+    '/imports': ('page2b', 'imports_choropleth', 'imports_histogram', 'imports_line', 'imports_figure_stamp'),
+    '/growth': ('page3', 'gdp_choropleth', 'gdp_histogram', 'gdp_line', 'gdp_figure_stamp'),
+}
+
+# endpoint every dash callback is posted to
+UPDATE_PATH = '/_dash-update-component'
+
+
+def callback_payload(outputs, inputs, changed, state=()):
+    # helper function returns the json body dash's renderer posts for a callback - outputs is a list
+    # of (id, property), inputs and state lists of (id, property, value), and changed the triggering prop ids
+    output_specs = [{'id': output_id, 'property': prop} for output_id, prop in outputs]
+    if len(outputs) == 1:
+        output = '{}.{}'.format(*outputs[0])
+        output_specs = output_specs[0]
+    else:
+        output = '..' + '...'.join('{}.{}'.format(output_id, prop) for output_id, prop in outputs) + '..'
+    return {
+        'output': output,
+        'outputs': output_specs,
+        'inputs': [{'id': input_id, 'property': prop, 'value': value} for input_id, prop, value in inputs],
+        'changedPropIds': list(changed),
+        'state': [{'id': state_id, 'property': prop, 'value': value} for state_id, prop, value in state],
+    }
+
+
+class Session:
+    # one simulated user on one route - builds the payloads of its page load and of each action
+
+    def __init__(self, route, page, rng):
+        self.route = route
+        self.choropleth, self.violin, self.line, self.stamp_id = ROUTES[route][1:]
+        self.indicators = [option['value'] for option in page.indicator_dict]
+        self.incomes = [option['value'] for option in page.income_dict]
+        self.years = list(page.new_cols)
+        self.rng = rng
+        self.indicator = self.indicators[0]
+        self.income = self.incomes[0]
+        self.year = self.years[0]
+        # indicator and income group of the figures the server last sent (the page's stamp store)
+        self.stamp = None
+
+    def map_request(self, changed):
+        payload = callback_payload(
+            [(self.choropleth, 'figure'), (self.violin, 'figure'), (self.stamp_id, 'data')],
+            [('indicator_dropdown', 'value', self.indicator), ('income_dropdown', 'value', self.income),
+             ('year_slider', 'value', self.year)],
+            changed,
+            [(self.stamp_id, 'data', self.stamp)])
+        # requests of a session are sequential, so after this one the browser shows the current selection
+        self.stamp = {'indicator': self.indicator, 'income': self.income}
+        return ('maps', payload)
+
+    def line_request(self, changed):
+        return ('line', callback_payload([(self.line, 'figure')], [('indicator_dropdown', 'value', self.indicator)], changed))
+
+    def page_load(self):
+        # the route callback, then the initial call of every page callback (nothing triggered)
+        return [('route', callback_payload([('page-content', 'children')], [('url', 'pathname', self.route)], ['url.pathname'])),
+                self.line_request([]), self.map_request([])]
+
+    def next_action(self, scrub_weight, income_weight, indicator_weight):
+        # pick the next user action - a slider step to a neighbouring year, or a new income group or indicator
+        action = self.rng.choices(['year', 'income', 'indicator'], [scrub_weight, income_weight, indicator_weight])[0]
+        if action == 'year':
+            position = self.years.index(self.year) + self.rng.choice([-1, 1])
+            self.year = self.years[min(max(position, 0), len(self.years) - 1)]
+            return [self.map_request(['year_slider.value'])]
+        if action == 'income':
+            self.income = self.rng.choice(self.incomes)
+            return [self.map_request(['income_dropdown.value'])]
+        self.indicator = self.rng.choice(self.indicators)
+        return [self.line_request(['indicator_dropdown.value']), self.map_request(['indicator_dropdown.value'])]
+
+
+def http_client(url):
+    # helper function returns a post function sending payloads to a running server over http
+    import requests
+
+    session = requests.Session()
+
+    def post(payload):
+        response = session.post(url + UPDATE_PATH, json = payload)
+        return response.status_code, len(response.content)
+
+    return post
+
+
+def in_process_client(server):
+    # helper function returns a post function sending payloads to the flask app in this process
+    client = server.test_client()
+
+    def post(payload):
+        response = client.post(UPDATE_PATH, json = payload)
+        return response.status_code, len(response.get_data())
+
+    return post
+
+
+def run_user(make_client, route, page, seed, deadline, args, results, lock):
+    # helper function plays one user's session until the deadline, recording (route, callback,
+    # seconds, status, bytes) of every request
+    rng = random.Random(seed)
+    post = make_client()
+    session = Session(route, page, rng)
+    records = []
+    batch = session.page_load()
+    while time.perf_counter() < deadline:
+        for callback, payload in batch:
+            start = time.perf_counter()
+            try:
+                status, size = post(payload)
+            except Exception:
+                status, size = 'error', 0
+            records.append((route, callback, time.perf_counter() - start, status, size))
+        if args.think:
+            time.sleep(rng.uniform(0, 2 * args.think / 1000))
+        batch = session.next_action(args.scrub_weight, args.income_weight, args.indicator_weight)
+    with lock:
+        results.extend(records)
+
+
+def run_load(make_client, pages, args, config):
+    # helper function runs args.users concurrent sessions for args.duration seconds, spread over
+    # the routes, and returns a result row per route and callback (plus every request together)
+    results = []
+    lock = threading.Lock()
+    routes = list(pages)
+    start = time.perf_counter()
+    deadline = start + args.duration
+    with ThreadPoolExecutor(max_workers = args.users) as executor:
+        futures = [executor.submit(run_user, make_client, routes[user % len(routes)], pages[routes[user % len(routes)]],
+                                   args.seed + user, deadline, args, results, lock)
+                   for user in range(args.users)]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+
+    groups = {}
+    for route, callback, seconds, status, size in results:
+        for key in [(route, callback), (route, '*'), ('*', '*')]:
+            groups.setdefault(key, []).append((seconds, status, size))
+    rows = []
+    for (route, callback), records in sorted(groups.items()):
+        ok = [seconds for seconds, status, size in records if status in (200, 204)]
+        row = dict(latency_summary(ok), config = config, route = route, callback = callback,
+                   errors = len(records) - len(ok), rps = len(ok) / elapsed,
+                   kb_per_response = sum(size for seconds, status, size in records) / max(len(records), 1) / 1e3)
+        rows.append(row)
+    return rows
+
+
+def start_gunicorn(workers, threads, port):
+    # helper function starts gunicorn serving index:server and waits until it answers
+    import requests
+
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'index:server', '--workers', str(workers), '--threads', str(threads),
+         '--bind', '127.0.0.1:{}'.format(port), '--log-level', 'warning'],
+        cwd = ROOT)
+    url = 'http://127.0.0.1:{}'.format(port)
+    for attempt in range(600):
+        if process.poll() is not None:
+            raise RuntimeError("gunicorn exited with code {}".format(process.returncode))
+        try:
+            requests.get(url + '/_dash-layout', timeout = 1)
+            return process, url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("gunicorn didn't start on port {}".format(port))
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Replay concurrent dashboard sessions against the flask server")
+    parser.add_argument('--url', help = "base url of a running server (default: app.server in this process)")
+    parser.add_argument('--gunicorn', nargs = '+', metavar = 'WORKERSxTHREADS',
+                        help = "start gunicorn with each workers x threads configuration in turn")
+    parser.add_argument('--port', type = int, default = 8765, help = "port of the gunicorn servers")
+    parser.add_argument('--routes', nargs = '+', default = list(ROUTES), choices = list(ROUTES))
+    parser.add_argument('--users', type = int, default = 20, help = "concurrent simulated users")
+    parser.add_argument('--duration', type = float, default = 30, help = "seconds each configuration is loaded")
+    parser.add_argument('--think', type = float, default = 0, help = "mean pause between user actions in ms")
+    parser.add_argument('--scrub-weight', type = float, default = 8, help = "relative frequency of year slider steps")
+    parser.add_argument('--income-weight', type = float, default = 1, help = "relative frequency of income group changes")
+    parser.add_argument('--indicator-weight', type = float, default = 1, help = "relative frequency of indicator changes")
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--json', help = "also write the results to this json file")
+    args = parser.parse_args()
+
+    # page modules only provide the pulldown options and years of each route
+    pages = {route: importlib.import_module('pages.' + ROUTES[route][0]) for route in args.routes}
+
+    rows = []
+    if args.gunicorn:
+        for config in args.gunicorn:
+            workers, threads = (int(part) for part in config.lower().split('x'))
+            process, url = start_gunicorn(workers, threads, args.port)
+            try:
+                rows.extend(run_load(lambda: http_client(url), pages, args, 'gunicorn {}'.format(config)))
+            finally:
+                process.terminate()
+                process.wait()
+    elif args.url:
+        rows.extend(run_load(lambda: http_client(args.url.rstrip('/')), pages, args, args.url))
+    else:
+        os.chdir(ROOT)
+        from index import server
+        rows.extend(run_load(lambda: in_process_client(server), pages, args, 'in-process'))
+
+    print()
+    print_table(rows, ['config', 'route', 'callback', 'count', 'errors', 'rps', 'mean_ms', 'p50_ms', 'p95_ms',
+                       'p99_ms', 'max_ms', 'kb_per_response'])
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent = 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,7 @@
     # Import necessary libraries 
+import time
+start = time.perf_counter()
+
 from dash import html, dcc
 from dash.dependencies import Input, Output
 
@@ -8,6 +11,16 @@ from app import app, server
 # Connect to app pages
 from pages import home, page1b, page2b, page3
 
+# record how long the app and its pages took to import (startup stage on the /metrics endpoint)
+from utils.metrics import metrics
+metrics.observe('startup', 'import', time.perf_counter() - start)
+
+# optionally render every page's figures into the figure cache at startup (WARM_FIGURE_CACHE=1)
+from utils.figure_cache import WARM_UP, warm_up_pages
+from utils.indicators import check_years
+if WARM_UP:
+    warm_up_pages([page1b, page2b, page3])
+
 import dash_bootstrap_components as dbc
 
 # define the navbar
@@ -45,18 +58,36 @@ app.layout = html.Div([
     html.Div(id='page-content', children=[]), 
 ])
 
-# Display page according to href
+# map hrefs to the indicator pages
+pages = {
+    '/inflation': page1b,
+    '/imports': page2b,
+    '/growth': page3,
+}
+
+# layout shown instead of an indicator page whose data can't be read
+def unavailable_layout(pathname):
+    return html.Div(
+        [
+            html.H2("This page is temporarily unavailable"),
+            html.P("The data behind {} couldn't be read. Please try again in a few minutes.".format(pathname)),
+        ],
+        style = {'textAlign': 'center', 'margin': '40px'},
+    )
+
+# Display page according to href - the page's years are checked against the database on its first
+# visit instead of at import, so starting a worker doesn't touch the database (a successful check
+# is kept for the life of the worker, a failed one shows the unavailable layout and runs again on
+# the next visit)
 @app.callback(Output('page-content', 'children'),
               [Input('url', 'pathname')])
 def display_page(pathname):
-    if pathname == '/inflation':
-        return page1b.layout
-    if pathname == '/imports':
-        return page2b.layout
-    if pathname == '/growth':
-        return page3.layout
-    else:
+    page = pages.get(pathname)
+    if page is None:
         return home.layout
+    if not check_years(page.year_table, page.new_cols):
+        return unavailable_layout(pathname)
+    return page.layout
 
 # Run the app on localhost:8050
 if __name__ == '__main__':
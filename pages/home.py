@@ -1,5 +1,6 @@
 from dash import dcc, html
 import dash_bootstrap_components as dbc
+from utils.images import responsive_image
 
 layout = html.Div(
     [
@@ -14,8 +15,10 @@ layout = html.Div(
                                         html.Div(
                                             # map image container
                                             [
-                                                html.Img(
-                                                    src = "assets/income-map.png",
+                                                # displayed at the map container's 70% width
+                                                responsive_image(
+                                                    "income-map.png",
+                                                    sizes = "70vw",
                                                     height = 650,
                                                     className = "main_img",
                                                 ),
@@ -0,0 +1,75 @@
+# checks that IncomeIndex.select returns the same rows as the if/elif income group filter the
+# pages used before utils/filters.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.filters import INCOME_GROUPS, IncomeIndex
+
+# every value of the income group pulldown menu, plus a value outside it (which the old filter's
+# else branch treated as Uncategorized)
+INCOMES = ["World"] + INCOME_GROUPS + ["Not an income group"]
+
+COLUMNS = ['country_name', 'country_code', 'income_group', 2001]
+
+
+def indicator_table():
+    # helper function returns a small indicator df with the income groups interleaved, a missing
+    # value, and a non-default index, like the tables read from the data sources
+    groups = ["High income", "Low income", "Uncategorized", "Lower middle income", "Upper middle income",
+              "Low income", "High income", "Upper middle income", "Uncategorized", "Lower middle income"]
+    codes = ['C{:02d}'.format(row) for row in range(len(groups))]
+    return pd.DataFrame({
+        'country_code': codes,
+        'income_group': groups,
+        'country_name': ['Country ' + code for code in codes],
+        2001: [1.5, np.nan, 3.25, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0],
+        2002: np.arange(len(groups), dtype = float),
+    }, index = np.arange(10, 10 + len(groups)))
+
+
+def if_elif_filter(df, income, columns):
+    # the filter of the pages before IncomeIndex
+    df_no_uc = df.loc[df['income_group'] != "Uncategorized"]
+    li = df['country_code'].loc[df['income_group'] == "Low income"]
+    lmi = df['country_code'].loc[df['income_group'] == "Lower middle income"]
+    umi = df['country_code'].loc[df['income_group'] == "Upper middle income"]
+    hi = df['country_code'].loc[df['income_group'] == "High income"]
+    uc = df['country_code'].loc[df['income_group'] == "Uncategorized"]
+    if income == "World":
+        filtered_df = df.loc[:, columns]
+        filtered_df_no_uc = df_no_uc.loc[:, columns]
+    elif income == 'Low income':
+        filtered_df = df.loc[df['country_code'].isin(li), columns]
+        filtered_df_no_uc = df_no_uc.loc[df['country_code'].isin(li), columns]
+    elif income == 'Lower middle income':
+        filtered_df = df.loc[df['country_code'].isin(lmi), columns]
+        filtered_df_no_uc = df_no_uc.loc[df['country_code'].isin(lmi), columns]
+    elif income == 'Upper middle income':
+        filtered_df = df.loc[df['country_code'].isin(umi), columns]
+        filtered_df_no_uc = df_no_uc.loc[df['country_code'].isin(umi), columns]
+    elif income == 'High income':
+        filtered_df = df.loc[df['country_code'].isin(hi), columns]
+        filtered_df_no_uc = df_no_uc.loc[df['country_code'].isin(hi), columns]
+    else:
+        filtered_df = df.loc[df['country_code'].isin(uc), columns]
+        filtered_df_no_uc = df.loc[df['country_code'].isin(uc), columns]
+    return filtered_df, filtered_df_no_uc
+
+
+@pytest.mark.parametrize('income', INCOMES)
+def test_select_matches_if_elif_filter(income):
+    df = indicator_table()
+    filtered_df, filtered_df_no_uc = IncomeIndex(df['income_group']).select(df, income, COLUMNS)
+    expected_df, expected_df_no_uc = if_elif_filter(df, income, COLUMNS)
+    pd.testing.assert_frame_equal(filtered_df, expected_df)
+    pd.testing.assert_frame_equal(filtered_df_no_uc, expected_df_no_uc)
+
+
+@pytest.mark.parametrize('income', INCOMES)
+def test_select_without_columns_keeps_every_column(income):
+    df = indicator_table()
+    filtered_df, filtered_df_no_uc = IncomeIndex(df['income_group']).select(df, income)
+    expected_df, expected_df_no_uc = if_elif_filter(df, income, list(df.columns))
+    pd.testing.assert_frame_equal(filtered_df, expected_df)
+    pd.testing.assert_frame_equal(filtered_df_no_uc, expected_df_no_uc)
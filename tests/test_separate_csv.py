@@ -0,0 +1,47 @@
+# checks that ETL/load_data.py's separate_csv writes the same files however the extract is chunked
+import importlib.util
+import os
+import shutil
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(ROOT, 'data')
+EXTRACT = 'P_Data_Extract_From_World_Development_Indicators (1).csv'
+
+
+def load_etl():
+    # helper function imports ETL/load_data.py (a script directory, not a package)
+    spec = importlib.util.spec_from_file_location('load_data', os.path.join(ROOT, 'ETL', 'load_data.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def separate(tmp_path, name, chunksize):
+    # helper function runs separate_csv on a scratch copy of the bundled extract (laid out the way
+    # the ETL expects, '../data/' seen from ETL/) and returns {file name: contents} of its output
+    workspace = tmp_path / name
+    os.makedirs(workspace / 'ETL')
+    os.makedirs(workspace / 'data' / 'extracted')
+    shutil.copy(os.path.join(DATA_PATH, 'income_groups.csv'), workspace / 'data')
+    shutil.copy(os.path.join(DATA_PATH, 'extracted', EXTRACT), workspace / 'data' / 'extracted')
+    cwd = os.getcwd()
+    os.chdir(workspace / 'ETL')
+    try:
+        load_etl().separate_csv(chunksize = chunksize)
+    finally:
+        os.chdir(cwd)
+    separated = workspace / 'data' / 'extracted' / 'separated'
+    return {file: (separated / file).read_bytes() for file in sorted(os.listdir(separated))}
+
+
+# 7 rows splits series across chunks and leaves a last chunk of only the notes at the bottom of the extract
+@pytest.mark.parametrize('chunksize', [7, 100])
+def test_chunked_output_is_byte_identical(tmp_path, chunksize):
+    whole = separate(tmp_path, 'whole', 100000)
+    chunked = separate(tmp_path, 'chunked', chunksize)
+    assert whole
+    assert list(chunked) == list(whole)
+    for file in whole:
+        assert chunked[file] == whole[file], file
@@ -0,0 +1,134 @@
+# build-time optimization of the files in assets/ - writes brotli (.br) and gzip (.gz) variants of
+# the text assets next to them, which utils/http.py serves to browsers that accept them, and
+# resized WebP (and AVIF, when the pillow-avif-plugin is installed) variants of the images with
+# resized fallbacks in their own format, which utils/images.py references through srcset
+#
+# run with `python -m utils.assets` from the repository root after changing an asset
+import gzip
+import json
+import os
+import sys
+
+# define the assets folder and the text assets that get precompressed variants (images are
+# already compressed)
+ASSETS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets')
+TEXT_SUFFIXES = ('.css', '.js', '.json', '.svg', '.html', '.txt', '.map')
+
+# define the images that get responsive variants, the folder (inside assets/) the variants and
+# their manifest are written to, and the widths they're resized to (those smaller than the source
+# image, or just the source width for images narrower than all of them)
+IMAGE_SUFFIXES = ('.png', '.jpg', '.jpeg')
+OPTIMIZED_FOLDER = 'optimized'
+MANIFEST = 'manifest.json'
+IMAGE_WIDTHS = (120, 240, 480, 960, 1280, 1920)
+
+# encoder settings of each variant format - {mime type: (file extension, pillow format, save options)}
+IMAGE_FORMATS = {
+    'image/avif': ('avif', 'AVIF', {'quality': 50, 'speed': 4}),
+    'image/webp': ('webp', 'WEBP', {'quality': 80, 'method': 6}),
+    'image/png': ('png', 'PNG', {'optimize': True}),
+    'image/jpeg': ('jpg', 'JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+
+def compress_file(path, encoding):
+    # helper function writes the brotli or gzip variant of a file next to it, returning the variant
+    # path and size, or None if compressing doesn't make it smaller
+    with open(path, 'rb') as f:
+        data = f.read()
+    if encoding == 'br':
+        import brotli
+
+        compressed = brotli.compress(data, quality = 11)
+        variant = path + '.br'
+    else:
+        # mtime 0 keeps the variant byte-identical between builds
+        compressed = gzip.compress(data, compresslevel = 9, mtime = 0)
+        variant = path + '.gz'
+    if len(compressed) >= len(data):
+        if os.path.isfile(variant):
+            os.remove(variant)
+        return None
+    with open(variant + '.tmp', 'wb') as f:
+        f.write(compressed)
+    os.replace(variant + '.tmp', variant)
+    return variant, len(compressed)
+
+
+def precompress_assets(path=ASSETS_PATH):
+    # function writes the precompressed variants of every text asset in path, printing their sizes
+    for file in sorted(os.listdir(path)):
+        if not file.endswith(TEXT_SUFFIXES):
+            continue
+        source = os.path.join(path, file)
+        size = os.path.getsize(source)
+        for encoding in ('br', 'gzip'):
+            result = compress_file(source, encoding)
+            if result is not None:
+                variant, compressed_size = result
+                print("Compressed {} ({} bytes) to {} ({} bytes)".format(file, size, os.path.basename(variant), compressed_size))
+
+
+def image_formats(fallback):
+    # helper function returns the mime types an image's variants are written in - AVIF when pillow
+    # can encode it (the pillow-avif-plugin registers the encoder), WebP, and the fallback format
+    formats = []
+    try:
+        # importing the plugin registers its AVIF encoder with pillow
+        import pillow_avif  # noqa: F401
+        formats.append('image/avif')
+    except ImportError:
+        pass
+    return formats + ['image/webp', fallback]
+
+
+def optimize_image(path, target_path):
+    # helper function writes the resized variants of one image into target_path and returns its
+    # manifest entry - source size and, for each mime type, the [file name, width] of every variant
+    from PIL import Image
+
+    name, extension = os.path.splitext(os.path.basename(path))
+    fallback = 'image/png' if extension.lower() == '.png' else 'image/jpeg'
+    with Image.open(path) as source:
+        # palette images are resized in full color (pillow only resizes them by nearest neighbour)
+        image = source.convert('RGBA') if source.mode not in ('RGB', 'RGBA', 'L') else source.copy()
+        width, height = image.size
+        widths = [target for target in IMAGE_WIDTHS if target < width] or [width]
+        entry = {'width': width, 'height': height, 'variants': {}}
+        for target in widths:
+            resized = image.resize((target, round(height * target / width)), Image.LANCZOS)
+            for mime_type in image_formats(fallback):
+                file_extension, image_format, options = IMAGE_FORMATS[mime_type]
+                if image_format == 'JPEG' and resized.mode not in ('RGB', 'L'):
+                    resized = resized.convert('RGB')
+                file = '{}-{}.{}'.format(name, target, file_extension)
+                resized.save(os.path.join(target_path, file), image_format, **options)
+                entry['variants'].setdefault(mime_type, []).append([file, target])
+    return entry
+
+
+def optimize_images(path=ASSETS_PATH):
+    # function writes the responsive variants of every image in path into its optimized folder,
+    # with a manifest of the variants read by utils/images.py
+    target_path = os.path.join(path, OPTIMIZED_FOLDER)
+    os.makedirs(target_path, exist_ok = True)
+    manifest = {}
+    for file in sorted(os.listdir(path)):
+        if not file.lower().endswith(IMAGE_SUFFIXES):
+            continue
+        manifest[file] = optimize_image(os.path.join(path, file), target_path)
+        source_size = os.path.getsize(os.path.join(path, file))
+        for mime_type, variants in manifest[file]['variants'].items():
+            sizes = ', '.join('{}px {:.0f} KB'.format(width, os.path.getsize(os.path.join(target_path, variant)) / 1e3)
+                              for variant, width in variants)
+            print("{} ({:.0f} KB) as {}: {}".format(file, source_size / 1e3, mime_type, sizes))
+    with open(os.path.join(target_path, MANIFEST + '.tmp'), 'w') as f:
+        json.dump(manifest, f, indent = 1)
+    os.replace(os.path.join(target_path, MANIFEST + '.tmp'), os.path.join(target_path, MANIFEST))
+    return manifest
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else ASSETS_PATH
+    optimize_images(path)
+    precompress_assets(path)
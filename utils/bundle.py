@@ -0,0 +1,84 @@
+# precomputed bundle of every page's figures so the dashboard can run without postgres
+#
+# build with `python -m utils.bundle [path]` from the repository root, then start the app with
+# FIGURE_BUNDLE=<path> to serve the figures from the bundle ("static" mode)
+import json
+import os
+import sys
+import time
+import zipfile
+from datetime import datetime, timezone
+
+# define default bundle location and the bundle served by the app (unset means figures are
+# rendered from postgres as usual)
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'figure_bundle.zip')
+BUNDLE_PATH = os.environ.get('FIGURE_BUNDLE')
+
+MANIFEST = 'manifest.json'
+
+
+def entry_name(key):
+    # helper function names the bundle entry holding the figures of one figure cache key
+    # (page, function, indicator, *other inputs)
+    return '/'.join(str(part).replace(' ', '_') for part in key) + '.json'
+
+
+def page_name(module_name):
+    # helper function strips the package from a page module name ('pages.page1b' -> 'page1b')
+    return module_name.rsplit('.', 1)[-1]
+
+
+class FigureBundle:
+    # read-only view of a bundle written by build_bundle()
+
+    def __init__(self, path):
+        self.path = path
+        self._zip = zipfile.ZipFile(path)
+        self.manifest = json.loads(self._zip.read(MANIFEST))
+
+    def figures(self, key):
+        # return the json of each figure stored for a figure cache key, or None if it wasn't bundled
+        try:
+            entry = self._zip.read(entry_name(key))
+        except KeyError:
+            return None
+        return tuple(entry.decode('utf-8').split('\n'))
+
+
+def build_bundle(pages, path=DEFAULT_PATH):
+    # render every combination of pulldown options and years of each page module through the
+    # figure cache and write its contents to a compressed zip of plotly json (one line per figure),
+    # writing to a temporary file first so a running app never reads a half-written bundle
+    from utils.figure_cache import figure_cache
+
+    figure_cache.maxsize = float('inf')
+    manifest = {'built': datetime.now(timezone.utc).isoformat(), 'pages': {}}
+    for page in pages:
+        start = time.perf_counter()
+        figure_cache.warm_up(page.update_figure, page.indicator_dict, page.income_dict, page.new_cols)
+        manifest['pages'][page_name(page.__name__)] = {
+            'indicators': [option['value'] for option in page.indicator_dict],
+            'incomes': [option['value'] for option in page.income_dict],
+            'years': list(page.new_cols),
+        }
+        print("Rendered figures for {} in {:.1f}s".format(page_name(page.__name__), time.perf_counter() - start))
+
+    tmp_path = path + '.tmp'
+    with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
+        entries = figure_cache.items()
+        for key, figures in entries:
+            zf.writestr(entry_name(key), '\n'.join(figures))
+        zf.writestr(MANIFEST, json.dumps(manifest))
+    os.replace(tmp_path, path)
+    print("Bundled {} figure entries into {}".format(len(entries), path))
+    return path
+
+
+# bundle served by the app in static mode
+static_bundle = FigureBundle(BUNDLE_PATH) if BUNDLE_PATH else None
+
+
+if __name__ == '__main__':
+    from pages import page1b, page2b, page3
+
+    build_bundle([page1b, page2b, page3], sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH)
@@ -0,0 +1,105 @@
+# shared in-process cache for the indicator tables pulled by the page callbacks
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# define how many indicator tables are held in memory and how often (in seconds)
+# the etl_table_versions relation is checked for tables reloaded by ETL/load_data.py
+CACHE_SIZE = int(os.environ.get('TABLE_CACHE_SIZE', 32))
+CHECK_INTERVAL = float(os.environ.get('TABLE_CACHE_CHECK', 60))
+
+# query returning the time each table was last loaded by create_tables()
+VERSION_QUERY = "SELECT table_name, loaded_at FROM etl_table_versions"
+
+
+def read_versions(conn):
+    # helper function reads {table name: load time} from the etl_table_versions relation,
+    # returns None if it can't be read (relation not created by an older ETL, or the database
+    # is unreachable), which leaves the cached tables in place
+    try:
+        with conn.cursor() as cur:
+            cur.execute(VERSION_QUERY)
+            rows = cur.fetchall()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        return None
+    return {table: loaded_at for table, loaded_at in rows}
+
+
+class TableCache:
+    # least recently used cache of indicator dataframes keyed by (table, first year, last year, variant)
+
+    def __init__(self, maxsize=CACHE_SIZE, check_interval=CHECK_INTERVAL):
+        self.maxsize = maxsize
+        self.check_interval = check_interval
+        self._tables = OrderedDict()
+        self._versions = None
+        self._last_check = 0.0
+        self._version_source = None
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    def set_version_source(self, source):
+        # source is a function returning {table name: version} used to detect reloaded tables,
+        # or None when the versions can't be read
+        self._version_source = source
+
+    def on_invalidate(self, listener):
+        # listener is called with the table name (or None for everything) whenever entries are dropped
+        self._listeners.append(listener)
+
+    def get(self, table, years, loader, variant=None):
+        # return the cached dataframe for table and year range, calling loader() on a miss;
+        # variant distinguishes several results read from one table (e.g. one indicator's rows);
+        # cached dataframes are shared between callbacks and must not be modified in place
+        self.check_versions()
+        key = (table, min(years), max(years), variant)
+        with self._lock:
+            if key in self._tables:
+                self._tables.move_to_end(key)
+                return self._tables[key]
+        df = loader()
+        with self._lock:
+            self._tables[key] = df
+            self._tables.move_to_end(key)
+            while len(self._tables) > self.maxsize:
+                self._tables.popitem(last=False)
+        return df
+
+    def invalidate(self, table=None):
+        # drop every cached entry for table, or the whole cache if no table is given
+        with self._lock:
+            for key in list(self._tables):
+                if table is None or key[0] == table:
+                    del self._tables[key]
+        for listener in self._listeners:
+            listener(table)
+
+    def check_versions(self, force=False):
+        # compare the etl_table_versions relation against the versions seen on the last check
+        # (at most once every check_interval seconds) and drop tables that have been reloaded
+        if self._version_source is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_check < self.check_interval:
+                return
+            self._last_check = now
+        versions = self._version_source()
+        if versions is None:
+            # versions couldn't be read - keep the cached tables (they may be all that's serving
+            # the pages while the database is down) and the versions of the last successful read
+            return
+        with self._lock:
+            previous, self._versions = self._versions, versions
+        if previous is None:
+            return
+        for table in set(previous) | set(versions):
+            if previous.get(table) != versions.get(table):
+                self.invalidate(table)
+
+
+# cache shared by every page module
+table_cache = TableCache()
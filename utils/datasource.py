@@ -0,0 +1,158 @@
+# pluggable data sources behind the page queries - indicator tables, yearly medians, and table
+# versions are read either from postgres or from the memory-mapped arrow (or parquet) files
+# written by ETL/load_data.py's separate_csv(formats=...), chosen with DATA_SOURCE
+import os
+
+# define which data source the pages read from - 'postgres' (default) or 'arrow' (no database
+# needed) - the postgres storage layout - 'wide' (one relation per indicator with a yrNNNN column
+# per year, loaded by create_tables) or 'long' (the indicator_values and countries relations,
+# loaded by create_long_tables) - and the directory of the arrow/parquet datasets
+DATA_SOURCE = os.environ.get('DATA_SOURCE', 'postgres')
+DATA_LAYOUT = os.environ.get('DATA_LAYOUT', 'wide')
+ARROW_PATH = os.environ.get('ARROW_DATA', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'extracted'))
+
+
+def year_columns(sql, years):
+    # helper function converts a list of int years into the quoted 'yr2001, yr2002, ...' column list
+    return sql.SQL(', ').join(sql.Identifier('yr' + str(yr)) for yr in years)
+
+
+def rename_years(df, years):
+    # helper function converts year columns from format 'yr2001' string format to 2001 int format
+    col_dict = dict(zip(df.columns[3:], years))
+    return df.rename(mapper = col_dict, axis = 1, copy = False)
+
+
+class PostgresSource:
+    # indicator data read from postgres - one relation per indicator ('wide' layout) or the
+    # indicator_values and countries relations ('long' layout)
+
+    def __init__(self, layout=DATA_LAYOUT):
+        # imported here so the file-backed source works without a database driver
+        import psycopg2
+        from psycopg2 import sql
+        from utils import db
+
+        self.layout = layout
+        self.db = db
+        # table names come from the page callbacks' inputs, so they're always quoted as identifiers
+        self.sql = sql
+        self.undefined_table = psycopg2.errors.UndefinedTable
+
+    def check_years(self, table, years):
+        # check the year columns exist in table (years are rows in the long layout)
+        if self.layout == 'wide':
+            self.db.create_pandas_table(self.sql.SQL("SELECT {yrs} FROM {table} limit 0").format(
+                yrs = year_columns(self.sql, years), table = self.sql.Identifier(table)))
+
+    def indicator_frame(self, indicator, years):
+        # return the indicator table (country_code, income_group, country_name, one column per int year)
+        if self.layout == 'long':
+            return self.query_long(indicator, years)
+        df = self.db.create_pandas_table(self.sql.SQL("SELECT country_code, income_group, country_name, {yrs} FROM {table}").format(
+            yrs = year_columns(self.sql, years), table = self.sql.Identifier(indicator)))
+        return rename_years(df, years)
+
+    def query_long(self, indicator, years):
+        # read one indicator over the year range from the long-format relations (the indicator and
+        # year filters are applied in postgres) and pivot it to the wide layout, keeping countries
+        # without values as rows of missing values like the wide relations do
+        df = self.db.create_pandas_table(
+            "SELECT c.country_code, c.income_group, c.country_name, v.year, v.value FROM countries c "
+            "LEFT JOIN indicator_values v ON v.country_code = c.country_code "
+            "AND v.indicator = %s AND v.year BETWEEN %s AND %s",
+            (indicator, min(years), max(years)))
+        countries = df[['country_code', 'income_group', 'country_name']].drop_duplicates()
+        df = df.dropna(subset = ['year']).astype({'year': int})
+        df = df.pivot(index = 'country_code', columns = 'year', values = 'value').reindex(columns = years)
+        df.columns.name = None
+        return countries.merge(df, how = 'left', left_on = 'country_code', right_index = True).reset_index(drop = True)
+
+    def medians(self, indicator, years):
+        # return the yearly median of each income group (years in the rows, income groups in the
+        # columns) from the indicator_summary relation, or None if it hasn't been built
+        try:
+            df = self.db.create_pandas_table(
+                "SELECT income_group, year, median FROM indicator_summary "
+                "WHERE indicator = %s AND year BETWEEN %s AND %s AND income_group <> 'Uncategorized'",
+                (indicator, min(years), max(years)))
+        except self.undefined_table:
+            return None
+        if df.empty:
+            return None
+        return df.pivot(index = 'year', columns = 'income_group', values = 'median')
+
+    def versions(self):
+        # return {table name: load time} from the etl_table_versions relation (None if unreadable)
+        return self.db.read_table_versions()
+
+
+class ArrowSource:
+    # indicator data read from the arrow IPC files (or parquet files) written by the ETL - arrow
+    # files are memory mapped and their year columns become read-only views of the mapping, so
+    # every gunicorn worker's cached tables share the os page cache (only the text columns are
+    # converted into per-worker objects), and startup doesn't wait on a database
+
+    def __init__(self, path=ARROW_PATH):
+        self.path = path
+
+    def file_path(self, indicator):
+        # return the arrow file of an indicator, falling back to its parquet file (indicators are
+        # names from the page callbacks' inputs, so anything that isn't a plain file name is unknown)
+        if not indicator or os.path.basename(indicator) != indicator or indicator in (os.curdir, os.pardir):
+            raise FileNotFoundError("No arrow or parquet data for indicator {!r}".format(indicator))
+        for fmt in ('arrow', 'parquet'):
+            path = os.path.join(self.path, fmt, 'indicator=' + indicator, 'part-0.' + fmt)
+            if os.path.isfile(path):
+                return path
+        raise FileNotFoundError("No arrow or parquet data for indicator {} in {}".format(indicator, self.path))
+
+    def read_table(self, indicator, columns):
+        # read columns of an indicator's dataset as an arrow table
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        path = self.file_path(indicator)
+        if path.endswith('.arrow'):
+            return pa.ipc.open_file(pa.memory_map(path)).read_all().select(columns)
+        return pq.read_table(path, columns = columns, memory_map = True)
+
+    def check_years(self, table, years):
+        # check the year columns exist in the table's dataset, if it was exported
+        try:
+            self.read_table(table, ['yr' + str(yr) for yr in years])
+        except FileNotFoundError:
+            pass
+
+    def indicator_frame(self, indicator, years):
+        # return the indicator table (country_code, income_group, country_name, one column per int year)
+        columns = ['country_code', 'income_group', 'country_name'] + ['yr' + str(yr) for yr in years]
+        # split_blocks keeps each year column its own block, converted without copying when it
+        # has no nulls (write_columnar stores missing values as NaN)
+        df = self.read_table(indicator, columns).to_pandas(split_blocks = True, self_destruct = False)
+        return rename_years(df, years)
+
+    def medians(self, indicator, years):
+        # the summary relation only exists in postgres - the medians are calculated from the table
+        return None
+
+    def versions(self):
+        # return {indicator: modification time} of the exported files, so files rewritten by the
+        # ETL drop the cached tables
+        versions = {}
+        for fmt in ('arrow', 'parquet'):
+            directory = os.path.join(self.path, fmt)
+            if os.path.isdir(directory):
+                for partition in os.listdir(directory):
+                    path = os.path.join(directory, partition, 'part-0.' + fmt)
+                    if os.path.isfile(path):
+                        versions.setdefault(partition.replace('indicator=', ''), os.stat(path).st_mtime_ns)
+        return versions
+
+
+def get_data_source(name=DATA_SOURCE):
+    # return the data source named by DATA_SOURCE
+    if name == 'arrow':
+        return ArrowSource()
+    return PostgresSource()
@@ -0,0 +1,143 @@
+# shared pooled database access layer used by every page in place of per-page psycopg2 connections
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+import pandas as pd
+import psycopg2
+from psycopg2 import pool
+
+from utils.cache import read_versions
+
+# define database connection variables using environmental variables
+DB_NAME = os.environ.get('DBNM')
+DB_USER = os.environ.get('DBUS')
+DB_PASS = os.environ.get('DBPS')
+DB_HOST = os.environ.get('DBHS')
+DB_PORT = os.environ.get('DBPT')
+
+# define pool size (set DB_POOL_MAX to at least the number of gunicorn threads per worker) and
+# how long (in seconds) a connection may sit idle before it is pinged on checkout
+POOL_MIN = int(os.environ.get('DB_POOL_MIN', 1))
+POOL_MAX = int(os.environ.get('DB_POOL_MAX', 8))
+HEALTH_CHECK_AGE = float(os.environ.get('DB_HEALTH_CHECK', 30))
+
+# errors meaning the connection itself is broken (as opposed to a bad query)
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+_pool = None
+_pool_lock = threading.Lock()
+# psycopg2 pools raise instead of waiting when every connection is checked out, so
+# callers wait on a semaphore sized to the pool instead
+_available = threading.BoundedSemaphore(POOL_MAX)
+# time each pooled connection was last returned, used to skip pings on busy connections (keyed on
+# the connection itself, as ids are reused once a discarded connection is garbage collected)
+_last_used = weakref.WeakKeyDictionary()
+
+
+def get_pool():
+    # create the connection pool on first use so importing a page doesn't connect to postgres
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = pool.ThreadedConnectionPool(POOL_MIN, POOL_MAX,
+                                                database=DB_NAME,
+                                                user=DB_USER,
+                                                password=DB_PASS,
+                                                host=DB_HOST,
+                                                port=DB_PORT)
+        return _pool
+
+
+def is_healthy(conn):
+    # helper function checks a pooled connection is still usable, pinging it if it has been idle
+    if conn.closed:
+        return False
+    if time.monotonic() - _last_used.get(conn, 0) < HEALTH_CHECK_AGE:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        return True
+    except CONNECTION_ERRORS:
+        return False
+
+
+def prepare(conn):
+    # helper function readies a connection checked out of the pool, returning False if it is dead
+    if conn.closed:
+        return False
+    try:
+        # pages only read, so run without holding transactions open between queries - set before
+        # the ping, which would otherwise open a transaction autocommit can't be changed inside
+        if not conn.autocommit:
+            conn.autocommit = True
+        return is_healthy(conn)
+    except CONNECTION_ERRORS:
+        return False
+
+
+def discard(db_pool, conn):
+    # helper function closes a broken connection and removes it from the pool
+    _last_used.pop(conn, None)
+    db_pool.putconn(conn, close=True)
+
+
+@contextmanager
+def connection():
+    # check a healthy connection out of the pool, replacing dead connections with new ones,
+    # and return it to the pool (or discard it if it broke while in use) when done
+    db_pool = get_pool()
+    with _available:
+        conn = db_pool.getconn()
+        broken = False
+        try:
+            if not prepare(conn):
+                discard(db_pool, conn)
+                conn = None
+                conn = db_pool.getconn()
+                if not prepare(conn):
+                    raise psycopg2.OperationalError("no usable connection to the database")
+            yield conn
+        except CONNECTION_ERRORS:
+            broken = True
+            raise
+        finally:
+            # every checked out connection goes back to the pool, even if preparing it failed
+            if conn is None:
+                pass
+            elif broken or conn.closed:
+                discard(db_pool, conn)
+            else:
+                _last_used[conn] = time.monotonic()
+                db_pool.putconn(conn)
+
+
+def create_pandas_table(sql_query, params=None, retries=1):
+    # run sql query on a pooled connection and return the result as a pandas df, retrying on a
+    # fresh connection if the database connection dropped mid-query
+    for attempt in range(retries + 1):
+        try:
+            with connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(sql_query, params)
+                    columns = [col[0] for col in cur.description]
+                    rows = cur.fetchall()
+            # coerce_float converts postgres numeric (Decimal) values as pd.read_sql_query does
+            return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+        except CONNECTION_ERRORS:
+            if attempt == retries:
+                raise
+
+
+def read_table_versions():
+    # read the etl_table_versions relation on a pooled connection for the shared table cache,
+    # returning None (rather than "no tables") when the database can't be reached, so the cache
+    # keeps its tables
+    try:
+        with connection() as conn:
+            return read_versions(conn)
+    except CONNECTION_ERRORS:
+        return None
@@ -0,0 +1,33 @@
+# fast json for figure payloads - plotly's json engine (which dash also encodes callback responses
+# with) is set to orjson, which encodes numpy arrays natively, and figure data arrays are rounded
+# so responses carry fewer digits
+import json
+import os
+
+import numpy as np
+import plotly.io as pio
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# define the json engine used by plotly and dash ('orjson' when installed unless JSON_ENGINE=json)
+# and the decimals kept in figure data arrays (FIGURE_PRECISION=-1 sends full precision) - the
+# hover text shows at most 2 decimals
+JSON_ENGINE = os.environ.get('JSON_ENGINE', 'orjson' if orjson is not None else 'json')
+FIGURE_PRECISION = int(os.environ.get('FIGURE_PRECISION', 4))
+
+pio.json.config.default_engine = JSON_ENGINE
+
+# parse cached figure json with the same engine
+loads = orjson.loads if JSON_ENGINE == 'orjson' else json.loads
+
+
+def compact(values, decimals=FIGURE_PRECISION):
+    # helper function returns the numeric data array of a figure as float64, rounded to decimals
+    # (missing values stay NaN and are encoded as null)
+    values = np.asarray(values, dtype = float)
+    if decimals < 0:
+        return values
+    return values.round(decimals)
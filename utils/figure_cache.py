@@ -0,0 +1,117 @@
+# server-side cache of the serialized figures returned by the page callbacks
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from utils.bundle import page_name, static_bundle
+from utils.cache import table_cache
+from utils.fast_json import loads
+from utils.figure_templates import figure_json
+from utils.metrics import metrics
+
+# define how many cached calls are held in memory - the three pages have about 750 combinations
+# of inputs between them - and whether to fill the cache at startup
+CACHE_SIZE = int(os.environ.get('FIGURE_CACHE_SIZE', 1024))
+WARM_UP = os.environ.get('WARM_FIGURE_CACHE', '0') == '1'
+
+
+class FigureCache:
+    # least recently used cache of plotly figure json keyed by (page, function, indicator, *other inputs)
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def memoize(self, func, page=None):
+        # decorator for a page function taking the indicator as first argument and returning a
+        # figure or a tuple of figures (plotly figures or figure dicts) - figures are stored serialized so a cached call skips all
+        # pandas and plotly construction, and in static mode they are read from the figure bundle
+        # instead of being rendered - every call is timed under the page function's name (page
+        # defaults to the name of the function's module)
+        page = page or page_name(func.__module__)
+        name = page + '.' + func.__name__
+
+        @wraps(func)
+        def wrapper(indicator, *args):
+            with metrics.callback(name, indicator):
+                return cached_call(indicator, *args)
+
+        def cached_call(indicator, *args):
+            # drop figures of tables reloaded by the ETL even when every figure is served from cache
+            if static_bundle is None:
+                table_cache.check_versions()
+            key = (page, func.__name__, indicator) + args
+            with self._lock:
+                figures = self._figures.get(key)
+                if figures is not None:
+                    self._figures.move_to_end(key)
+            if figures is None:
+                if static_bundle is not None:
+                    figures = static_bundle.figures(key)
+                if figures is None:
+                    result = func(indicator, *args)
+                    if not isinstance(result, tuple):
+                        result = (result,)
+                    with metrics.stage('serialize'):
+                        figures = tuple(figure_json(fig) for fig in result)
+                with self._lock:
+                    self._figures[key] = figures
+                    while len(self._figures) > self.maxsize:
+                        self._figures.popitem(last=False)
+            if len(figures) == 1:
+                return loads(figures[0])
+            return tuple(loads(fig) for fig in figures)
+
+        return wrapper
+
+    def items(self):
+        # return a snapshot of the (key, figure json) pairs held in the cache
+        with self._lock:
+            return list(self._figures.items())
+
+    def invalidate(self, indicator=None):
+        # drop every cached figure for indicator, or the whole cache if no indicator is given
+        with self._lock:
+            for key in list(self._figures):
+                if indicator is None or key[2] == indicator:
+                    del self._figures[key]
+
+    def warm_up(self, func, indicators, incomes, years):
+        # render every combination of the pulldown menu options (lists of {"value": ...} dicts)
+        # and years through a page's update_figure function
+        for indicator in indicators:
+            for income in incomes:
+                for year in years:
+                    func(indicator['value'], income['value'], year)
+
+
+# cache shared by every page module
+figure_cache = FigureCache()
+
+
+def drop_figures(table):
+    # helper function drops the figures built from a reloaded table - a reloaded summary
+    # relation touches every indicator's line graph, so it clears everything
+    if table == 'indicator_summary':
+        figure_cache.invalidate()
+    else:
+        figure_cache.invalidate(table)
+
+
+table_cache.on_invalidate(drop_figures)
+
+
+def warm_up_pages(pages):
+    # fill the figure cache for every page module in a background thread so worker startup isn't delayed
+    def run():
+        for page in pages:
+            start = time.perf_counter()
+            figure_cache.warm_up(page.update_figure, page.indicator_dict, page.income_dict, page.new_cols)
+            metrics.observe('startup', 'warm_up', time.perf_counter() - start, page_name(page.__name__))
+
+    thread = threading.Thread(target = run, name = 'figure-cache-warm-up', daemon = True)
+    thread.start()
+    return thread
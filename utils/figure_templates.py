@@ -0,0 +1,50 @@
+# figure skeletons - the layout and trace styling of each page's figures is built and validated by
+# plotly once per indicator and kept as plain dicts, so a callback only fills in the data arrays
+# instead of running plotly's validators over the whole figure on every request
+import plotly.io as pio
+
+from utils.filters import INCOME_GROUPS
+
+# order plotly express gives the violin plot and line graph traces (category_orders on the pages)
+INCOME_ORDER = INCOME_GROUPS[:4]
+
+# trace properties holding per-request data, dropped from the skeletons
+DATA_KEYS = ('x', 'y', 'z', 'locations', 'text', 'customdata')
+
+
+def trace_order(present):
+    # helper function orders the income groups present in a figure's data the way plotly express
+    # orders their traces - INCOME_ORDER, then order of appearance
+    present = list(present)
+    return [group for group in INCOME_ORDER if group in present] + [group for group in present if group not in INCOME_ORDER]
+
+
+def figure_template(fig):
+    # helper function converts a validated figure into a skeleton - its layout and its traces
+    # (keyed by trace name) without their data arrays
+    fig_dict = fig.to_plotly_json()
+    traces = {}
+    for trace in fig_dict['data']:
+        traces[trace.get('name')] = {key: value for key, value in trace.items() if key not in DATA_KEYS}
+    return {'layout': fig_dict['layout'], 'traces': traces}
+
+
+def fill_trace(template, name, **arrays):
+    # helper function returns a copy of a skeleton trace with the data arrays filled in
+    trace = dict(template['traces'][name])
+    trace.update(arrays)
+    return trace
+
+
+def fill_figure(template, traces):
+    # helper function returns the figure dict of a skeleton with the filled traces (the skeleton's
+    # layout is shared, never modified)
+    return {'data': traces, 'layout': template['layout']}
+
+
+def figure_json(fig):
+    # helper function serializes a plotly figure or a figure dict filled from a skeleton (already
+    # validated, so it's only encoded)
+    if isinstance(fig, dict):
+        return pio.to_json(fig, validate = False)
+    return fig.to_json()
@@ -0,0 +1,36 @@
+# income group filtering shared by the pages - the income_group column of an indicator table is
+# encoded as a categorical once when the table is loaded and the row positions of each income group
+# are kept, so selecting a group is a positional slice instead of isin() tests against lists of
+# country codes
+import numpy as np
+import pandas as pd
+
+# income group categories, in the order used for the violin plot and line graph
+INCOME_GROUPS = ["Low income", "Lower middle income", "Upper middle income", "High income", "Uncategorized"]
+
+
+class IncomeIndex:
+    # row positions of each income group (and of the whole world with and without uncategorized
+    # countries) in an indicator df - the income_group column itself stays plain text, since plotly
+    # express would draw empty violin traces for unused categories
+
+    def __init__(self, income_group):
+        codes = pd.Categorical(income_group, categories = INCOME_GROUPS).codes
+        self.positions = {group: np.flatnonzero(codes == code) for code, group in enumerate(INCOME_GROUPS)}
+        self.positions['World'] = np.arange(len(codes))
+        self.world_no_uc = np.flatnonzero(codes != INCOME_GROUPS.index("Uncategorized"))
+
+    def select(self, df, income, columns=None):
+        # return the rows of df in the selected income group and the same rows without uncategorized
+        # countries (which improves the violin plot visualization), limited to columns if given
+        rows = self.positions.get(income, self.positions["Uncategorized"])
+        rows_no_uc = self.world_no_uc if income == "World" else rows
+        columns = list(df.columns) if columns is None else columns
+        return take_rows(df, rows, columns), take_rows(df, rows_no_uc, columns)
+
+
+def take_rows(df, rows, columns):
+    # helper function returns the rows at positions rows of columns of df, taken column by column -
+    # row selections on the whole df (iloc, loc, df[columns]) consolidate its blocks in place, which
+    # would copy the year columns a cached table maps from its arrow file (see utils/datasource.py)
+    return pd.DataFrame({column: df[column].to_numpy()[rows] for column in columns}, index = df.index[rows])
@@ -0,0 +1,92 @@
+# http response tuning of the flask server - callback responses and text assets are compressed
+# (brotli or gzip, above a size threshold), assets are sent with Cache-Control and ETag headers, and
+# precompressed asset variants written by `python -m utils.assets` are served when the browser
+# accepts them
+import mimetypes
+import os
+import re
+
+from flask import request, send_file
+from werkzeug.utils import safe_join
+
+# define whether responses are compressed, the smallest response compressed (in bytes), and how
+# long (in seconds) browsers may use an asset before revalidating it with its ETag
+COMPRESS_RESPONSES = os.environ.get('COMPRESS_RESPONSES', '1') == '1'
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+ASSET_MAX_AGE = int(os.environ.get('ASSET_MAX_AGE', 86400))
+
+# content types compressed on the fly (images are already compressed)
+COMPRESS_MIMETYPES = [
+    'application/json',
+    'application/javascript',
+    'text/css',
+    'text/html',
+    'text/javascript',
+    'text/plain',
+    'image/svg+xml',
+]
+
+# precompressed variants of an asset, in order of preference - {content encoding: file suffix}
+PRECOMPRESSED = {'br': '.br', 'gzip': '.gz'}
+
+# encoding suffix flask-compress appends to the ETag of a response it compresses ('"abc"' is sent
+# as '"abc:br"')
+COMPRESSED_ETAG = re.compile(r':(?:br|gzip|deflate)"')
+
+
+def precompressed_variant(assets_folder, path):
+    # helper function returns the content encoding and path of the best precompressed variant of an
+    # asset the browser accepts, or None if there isn't one (or it's older than the asset)
+    source = safe_join(assets_folder, path)
+    if source is None or not os.path.isfile(source):
+        return None
+    for encoding, suffix in PRECOMPRESSED.items():
+        variant = source + suffix
+        if request.accept_encodings[encoding] and os.path.isfile(variant) \
+                and os.path.getmtime(variant) >= os.path.getmtime(source):
+            return encoding, variant
+    return None
+
+
+def configure_server(app):
+    # set up compression, asset caching, and precompressed assets on the server of a dash app
+    server = app.server
+
+    # assets (served by flask's static file handling) get Cache-Control: max-age and an ETag, so
+    # repeat visits revalidate with a conditional request instead of downloading them again
+    server.config['SEND_FILE_MAX_AGE_DEFAULT'] = ASSET_MAX_AGE
+
+    if COMPRESS_RESPONSES:
+        from flask_compress import Compress
+
+        server.config['COMPRESS_MIMETYPES'] = COMPRESS_MIMETYPES
+        server.config['COMPRESS_MIN_SIZE'] = COMPRESS_MIN_SIZE
+        server.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+        Compress(server)
+
+        @server.before_request
+        def strip_compressed_etags():
+            # browsers revalidate a compressed asset with its suffixed ETag, which never matches
+            # the ETag flask compares it to - restore the original so unchanged assets get a 304
+            if_none_match = request.environ.get('HTTP_IF_NONE_MATCH')
+            if if_none_match:
+                request.environ['HTTP_IF_NONE_MATCH'] = COMPRESSED_ETAG.sub('"', if_none_match)
+
+    assets_path = app.config.routes_pathname_prefix + app.config.assets_url_path.strip('/') + '/'
+
+    @server.before_request
+    def serve_precompressed_asset():
+        if request.method not in ('GET', 'HEAD') or not request.path.startswith(assets_path):
+            return None
+        path = request.path[len(assets_path):]
+        variant = precompressed_variant(app.config.assets_folder, path)
+        if variant is None:
+            return None
+        encoding, variant_path = variant
+        response = send_file(variant_path, mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream',
+                             max_age = ASSET_MAX_AGE, conditional = True, etag = True)
+        response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+    return server
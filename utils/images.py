@@ -0,0 +1,51 @@
+# responsive images for the page layouts - an image is rendered as a <picture> offering the AVIF
+# and WebP variants written by `python -m utils.assets` through srcset, with the resized images in
+# the original format as fallback, and as a plain <img> of the original file until they're built
+import json
+import os
+
+from dash import html
+
+from utils.assets import ASSETS_PATH, MANIFEST, OPTIMIZED_FOLDER
+
+
+def read_manifest(path=os.path.join(ASSETS_PATH, OPTIMIZED_FOLDER, MANIFEST)):
+    # helper function reads the manifest of the image variants, or {} if they haven't been built
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# variants of every image in assets/, read once at import
+image_manifest = read_manifest()
+
+
+def srcset(variants):
+    # helper function returns the srcset attribute of a list of [file name, width] variants
+    return ', '.join('assets/{}/{} {}w'.format(OPTIMIZED_FOLDER, file, width) for file, width in variants)
+
+
+def responsive_image(file, sizes, **props):
+    # return the image component of an asset - file is the image's name in assets/, sizes the width
+    # it's displayed at (the sizes attribute, e.g. '9vw'), and props the html.Img properties
+    # (className, height, width, ...) - the browser picks the smallest variant that's sharp at
+    # that size in the first format it supports
+    entry = image_manifest.get(file)
+    if entry is None:
+        return html.Img(src = "assets/" + file, **props)
+    variants = entry['variants']
+    fallback_type = next(mime_type for mime_type in variants if mime_type not in ('image/avif', 'image/webp'))
+    fallback = variants[fallback_type]
+    sources = [html.Source(type = mime_type, srcSet = srcset(variants[mime_type]), sizes = sizes)
+               for mime_type in ('image/avif', 'image/webp') if mime_type in variants]
+    return html.Picture(sources + [
+        html.Img(
+            # the largest fallback is the src of browsers without srcset support
+            src = 'assets/{}/{}'.format(OPTIMIZED_FOLDER, fallback[-1][0]),
+            srcSet = srcset(fallback),
+            sizes = sizes,
+            **props
+        )
+    ])
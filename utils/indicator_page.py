@@ -0,0 +1,479 @@
+# page engine shared by the indicator pages - each page module only declares its indicators,
+# years, texts, and component ids, and IndicatorPage builds its layout, figures, and callbacks on
+# top of the shared data layer (utils/indicators.py) and caches
+from dash import dcc, html, Input, Output, State, callback, no_update
+import dash_bootstrap_components as dbc
+import plotly.graph_objs as go
+import plotly.express as px
+import pandas as pd
+from utils.bundle import page_name
+from utils.fast_json import compact
+from utils.figure_cache import figure_cache
+from utils.figure_templates import figure_template, fill_figure, fill_trace, trace_order
+from utils.filters import INCOME_GROUPS
+from utils.images import responsive_image
+from utils.indicators import load_indicator_table, load_medians
+from utils.metrics import metrics
+from utils.patches import figure_stamp, year_only_change, year_patches
+from utils.scrub import CLIENTSIDE_SCRUB, register_scrub_callbacks
+
+# create dicts for income group pulldown menu (the same on every page) - "label": text displayed in
+# menu, "value": income group in the indicator tables, "title": hover text
+INCOME_OPTIONS = [
+    {
+        "label": "World",
+        "value": "World",
+        "title": "World"
+    },
+    {
+        "label": "Low Income",
+        "value": "Low income",
+        "title": "GNI per capita below $1,086"
+    },
+    {
+        "label": "Lower Middle Income",
+        "value": "Lower middle income",
+        "title": "GNI per capita between $1,086 and $4,255"
+    },
+    {
+        "label": "Upper Middle Income",
+        "value": "Upper middle income",
+        "title": "GNI per capita between $4,256 and $13,025"
+    },
+    {
+        "label": "High Income",
+        "value": "High income",
+        "title": "GNI per capita above $13,025"
+    },
+    {
+        "label": "Uncategorized",
+        "value": "Uncategorized",
+        "title": "Venezuela"
+    }
+]
+
+# define colors and order of the income groups in the violin plot and line graph
+INCOME_COLORS = {
+    'Low income': '#001D9B',
+    'Lower middle income': '#31009B',
+    'Upper middle income': '#7E009B',
+    'High income': '#9B006B',
+}
+INCOME_ORDER = {
+    "income_group": [
+        "Low income", "Lower middle income",
+        "Upper middle income", "High income",
+    ],
+}
+
+# keys of the pulldown menu entries (the rest of an indicator's dict holds its figure texts)
+OPTION_KEYS = ("label", "value", "title")
+
+# figure texts every indicator needs, from the page's figure_text or the indicator's own dict:
+# map_title, colorbar_title, violin_title, value_title (violin plot x-axis), line_title,
+# median_title (line graph y-axis), and hovertemplate (line graph)
+FIGURE_TEXT_KEYS = ("map_title", "colorbar_title", "violin_title", "value_title", "line_title", "median_title", "hovertemplate")
+
+
+class IndicatorPage:
+    # one indicator page - module_name is the page module's __name__ (figure cache, bundle, and
+    # metrics keys are named after it), indicators the pulldown menu entries with their figure
+    # texts, years the years covered, year_marks the labelled slider years, year_table the
+    # relation checked for the years on the page's first visit, and ids the component ids of the
+    # 'line', 'choropleth', 'violin' graphs, the year data 'store', and the 'stamp' store of the
+    # indicator and income group the choropleth and violin plot show
+
+    def __init__(self, module_name, header, indicator_label, indicators, years, year_marks, year_table, ids,
+                 figure_text=None, line_tickvals=None):
+        self.name = page_name(module_name)
+        self.header = header
+        self.indicator_label = indicator_label
+        self.indicator_dict = [{key: indicator[key] for key in OPTION_KEYS} for indicator in indicators]
+        metrics.add_indicators(indicator["value"] for indicator in indicators)
+        self.income_dict = INCOME_OPTIONS
+        self.years = list(years)
+        self.year_marks = year_marks
+        self.year_table = year_table
+        self.ids = ids
+        self.line_tickvals = line_tickvals
+
+        # resolve the figure texts of every indicator once
+        self.figure_text = {}
+        for indicator in indicators:
+            text = dict(figure_text or {})
+            text.update({key: value for key, value in indicator.items() if key not in OPTION_KEYS})
+            missing = [key for key in FIGURE_TEXT_KEYS if key not in text]
+            if missing:
+                raise ValueError("Indicator {} of {} has no {}".format(indicator["value"], self.name, ', '.join(missing)))
+            self.figure_text[indicator["value"]] = text
+
+        # skeletons of each indicator's figures, built on first use
+        self.map_templates = {}
+        self.line_templates = {}
+
+        # cache the serialized figures for each combination of inputs (the memoized functions
+        # replace the methods on the instance, keeping their names in the cache keys)
+        self.update_map_figures = figure_cache.memoize(self.update_map_figures, page = self.name)
+        self.update_line_figure = figure_cache.memoize(self.update_line_figure, page = self.name)
+
+        self.layout = self.build_layout()
+        self.register_callbacks()
+
+    def build_layout(self):
+        # Define the page layout
+        return html.Div(
+            [
+                dbc.Row(
+                    [
+                        # side bar
+                        dbc.Col(
+                            [
+                                # header
+                                html.H2(
+                                    children = self.header,
+                                    style = {'textAlign': 'center', 'color': '#FFFFFF', 'margin': '10px'}
+                                ),
+                                html.Br(),
+                                # globe image (displayed at half the sidebar's 18% width)
+                                responsive_image(
+                                    "globe1.png",
+                                    sizes = "9vw",
+                                    width = 240,
+                                    className = "globe",
+                                ),
+                                html.Br(),
+                                # indicator dropdown text description
+                                html.Label(
+                                    children = self.indicator_label,
+                                    className = "menu-title"
+                                ),
+                                # indicator dropdown
+                                dcc.Dropdown(
+                                    self.indicator_dict,
+                                    id = "indicator_dropdown",
+                                    value = self.indicator_dict[0]["value"],
+                                    className = 'dropdown',
+                                    clearable=False
+                                ),
+                                html.Br(),
+                                # income dropdown text description
+                                html.Div(
+                                    children = "Income Group",
+                                    className = "menu-title"
+                                ),
+                                # income dropdown
+                                dcc.Dropdown(
+                                    self.income_dict,
+                                    id = "income_dropdown",
+                                    value = "World",
+                                    className = 'dropdown',
+                                    clearable=False
+                                ),
+                                html.Br(),
+                                # year slider bar text description
+                                html.Div(
+                                    children = "Year",
+                                    className = "menu-title"
+                                ),
+                                # year slider
+                                dcc.Slider(
+                                    min = min(self.years),
+                                    max = max(self.years),
+                                    step = 1,
+                                    value = min(self.years),
+                                    marks = {year: str(year) for year in self.year_marks},
+                                    #tooltip property shows value on hover
+                                    tooltip={"placement": "bottom"},
+                                    id='year_slider',
+                                ),
+                                # year data of the selected indicator for clientside year scrubbing
+                                dcc.Store(id = self.ids['store']),
+                                # indicator and income group of the choropleth and violin plot in the browser
+                                dcc.Store(id = self.ids['stamp']),
+                            ], id='left-container',
+                        ),
+                        # main body
+                        dbc.Col(
+                            [
+                                dbc.Row(
+                                    [
+                                        html.Div(
+                                            children = [
+                                                # line graph
+                                                dcc.Graph(
+                                                    id = self.ids['line'],
+                                                    config = {'displayModeBar': False},
+                                                )
+                                            ], id = 'line-graph',
+                                        )
+                                    ], id = 'line'
+                                ),
+                                dbc.Row(
+                                    [
+                                        dbc.Col(
+                                            dbc.Row([
+                                                html.Div(
+                                                    # choropleth container
+                                                    [
+                                                        # choropleth
+                                                        dcc.Graph(
+                                                            id = self.ids['choropleth'],
+                                                            className = 'choropleth',
+                                                            config = {"displayModeBar": False},
+                                                        )
+                                                    ], id = 'choro',
+                                                ),
+                                                html.Div(
+                                                    # violin plot container
+                                                    [
+                                                        # violin plot
+                                                        dcc.Graph(
+                                                            id = self.ids['violin'],
+                                                            className = 'violin',
+                                                            config = {"displayModeBar": False},
+                                                        )
+                                                    ], id = "vio",
+                                                ),
+                                            ])
+                                        )
+                                    ], id = 'non-temporal_graphs'
+                                ),
+                            ], id = 'right-container'
+                        )
+                    ],
+                )
+            ]
+        )
+
+    def map_template(self, indicator):
+        # build the choropleth and violin plot of an indicator without data once - plotly validates
+        # the layout and styling here, and each request only fills the data arrays into the skeletons
+        templates = self.map_templates.get(indicator)
+        if templates is not None:
+            return templates
+        text = self.figure_text[indicator]
+
+        # define graph structures
+        # fig1 = choropleth
+        fig1 = go.Figure(
+            data = [
+                go.Choropleth()
+            ]
+        )
+        # update_layout sets graph size, font size, background color, title, etc.
+        fig1.update_layout(
+            # paper_bgcolor is the color of the background behind the plots
+            paper_bgcolor = '#BAD0E3',
+            font_size = 14,
+            # plot bg_color is the color of the background behind the text, legend, etc.
+            plot_bgcolor = '#E8EFF6',
+            legend_title = "<b>Income Groups</b>",
+            height = 400,
+            title_text = text['map_title']
+        )
+        # update_traces sets plot element colors, colorbar title, hover text template
+        fig1.update_traces(
+            colorscale = 'sunsetdark',
+            colorbar_title_text = text['colorbar_title'],
+            hovertemplate = ('%{z:.2f}% <extra>%{text}</extra>'),
+        )
+
+        # skeletons of the choropleth and of the violin plot with and without Uncategorized - plotly
+        # express lists the income groups of INCOME_ORDER on the y-axis, plus Uncategorized only
+        # when its countries are drawn (Uncategorized income selection)
+        templates = (
+            figure_template(fig1),
+            figure_template(self.violin_figure(INCOME_ORDER["income_group"], text)),
+            figure_template(self.violin_figure(INCOME_GROUPS, text)),
+        )
+        self.map_templates[indicator] = templates
+        return templates
+
+    def violin_figure(self, groups, text):
+        # fig2 = violin plot, drawn from one placeholder country per income group in groups so it
+        # has a trace (styled by plotly express) for each group
+        fig2 = px.violin(
+            pd.DataFrame({'income_group': groups, 'country_name': groups, 'value': 0.0}),
+            # x-axis is value of indicator
+            x = 'value',
+            # y-axis is the income group
+            y = 'income_group',
+            color = 'income_group',
+            # define colors for each income group
+            color_discrete_map = INCOME_COLORS,
+            category_orders = INCOME_ORDER,
+            # create variable to hold country name
+            custom_data = ['country_name'],
+        )
+        # update_layout sets graph size, font size, background color, title, etc.
+        fig2.update_layout(
+            paper_bgcolor = '#BAD0E3',
+            font_size = 14,
+            plot_bgcolor='#E8EFF6',
+            legend_title = "<b>Income Groups</b>",
+            height = 400,
+            title_text = text['violin_title']
+        )
+        # update_xaxes removes the vertical gridlines and sets the title
+        fig2.update_xaxes(
+            showgrid = False,
+            zeroline = False,
+            title = text['value_title']
+        )
+        # update_yaxes removes the y-axis ticks
+        fig2.update_yaxes(
+            showticklabels = False,
+            title = None,
+        )
+        # update_traces sets plots to show all country points, creates custom
+        # hovertext appearance, and sets jitter (vertical dispersion of points)
+        fig2.update_traces(
+            points = "all",
+            hovertemplate = "%{x:.2f}%<extra>%{customdata[0]}</extra>",
+            hoveron = "points + kde",
+            box_visible = True,
+            jitter = 0.5
+        )
+        return fig2
+
+    # define choropleth and violin plot - inputs include indicator, income group, and year
+    def update_map_figures(self, indicator, income, year):
+        # time each stage of the figure construction (see the /metrics endpoint)
+        laps = metrics.laps()
+        choropleth, violin, violin_uc = self.map_template(indicator)
+
+        # pull indicator table and the positions of each income group in it from the shared cache
+        # (only queries the data source on a cache miss)
+        df, income_index = load_indicator_table(indicator, self.years)
+        laps.lap('fetch')
+
+        # filter df by income group - filtered_df_no_uc leaves out countries not categorized into an
+        # income group (improves violin plot visualization)
+        filtered_df, filtered_df_no_uc = income_index.select(df, income, ['country_name', 'country_code', 'income_group', year])
+        laps.lap('filter')
+
+        # fig1 = choropleth - locations represent countries in selected income group, z is the
+        # indicator value for each country in the selected year, and text the full country name
+        fig1 = fill_figure(choropleth, [fill_trace(
+            choropleth, None,
+            locations = filtered_df['country_code'].to_numpy(),
+            z = compact(filtered_df[year]),
+            text = filtered_df['country_name'].to_numpy(),
+        )])
+
+        # fig2 = violin plot - one trace per income group present, x is the indicator value of each
+        # country and customdata holds its name
+        groups = filtered_df_no_uc['income_group']
+        present = trace_order(groups.unique())
+        if "Uncategorized" in present:
+            violin = violin_uc
+        traces = []
+        for group in present:
+            rows = filtered_df_no_uc.loc[groups == group]
+            traces.append(fill_trace(
+                violin, group,
+                x = compact(rows[year]),
+                y = rows['income_group'].to_numpy(),
+                customdata = rows[['country_name']].to_numpy(),
+            ))
+        fig2 = fill_figure(violin, traces)
+        laps.lap('figure')
+        return fig1, fig2
+
+    def line_template(self, indicator):
+        # build the line graph of an indicator without data once (see map_template)
+        template = self.line_templates.get(indicator)
+        if template is not None:
+            return template
+        text = self.figure_text[indicator]
+
+        # fig3 = line graph, drawn from placeholder medians so it has a trace for each income group
+        medians = pd.DataFrame(0.0, index = self.years, columns = pd.Index(INCOME_ORDER["income_group"], name = 'income_group'))
+        fig3 = px.line(
+            medians,
+            color_discrete_map = INCOME_COLORS,
+            category_orders = INCOME_ORDER,
+        )
+        # update_layout sets graph size, font size, background color, title, etc.
+        fig3.update_layout(
+            paper_bgcolor = '#BAD0E3',
+            font_size = 14,
+            plot_bgcolor='#E8EFF6',
+            legend_title = "<b>Income Groups</b>",
+            title_text = text['line_title']
+        )
+        # update_xaxes removes the vertical gridlines and sets the title (and ticks, if the page sets them)
+        fig3.update_xaxes(
+            showgrid = False,
+            zeroline = False,
+            title = "Year",
+        )
+        if self.line_tickvals is not None:
+            fig3.update_xaxes(
+                tickvals = self.line_tickvals
+            )
+        # update_yaxes removes the horizontal gridlines and sets the title
+        fig3.update_yaxes(
+            showgrid = False,
+            zeroline = False,
+            title = text['median_title'],
+        )
+        # update-traces sets custom hovertext
+        fig3.update_traces(
+            hovertemplate = text['hovertemplate']
+        )
+
+        template = figure_template(fig3)
+        self.line_templates[indicator] = template
+        return template
+
+    # define line graph - input is the indicator only (the yearly medians don't depend on income group or year)
+    def update_line_figure(self, indicator):
+        laps = metrics.laps()
+        template = self.line_template(indicator)
+
+        # pull the yearly median for each income group (precomputed by the ETL)
+        df_med_per_year = load_medians(indicator, self.years)
+        laps.lap('medians')
+
+        # fig3 = line graph - one trace per income group, with the years on the x-axis
+        fig3 = fill_figure(template, [
+            fill_trace(template, group, x = df_med_per_year.index.to_numpy(), y = compact(df_med_per_year[group]))
+            for group in trace_order(df_med_per_year.columns)
+            if group in template['traces']
+        ])
+        laps.lap('figure')
+        return fig3
+
+    # define function returning all three figures for one combination of inputs (used to warm the
+    # figure cache and build the figure bundle)
+    def update_figure(self, indicator, income, year):
+        return self.update_map_figures(indicator, income, year) + (self.update_line_figure(indicator),)
+
+    def register_callbacks(self):
+        # define callbacks - each figure only updates when one of its own inputs changes
+        callback(
+            Output(self.ids['line'], 'figure'),
+            Input('indicator_dropdown', 'value'))(self.update_line_figure)
+
+        # with clientside scrubbing the year slider only redraws the choropleth and violin plot in the browser
+        if CLIENTSIDE_SCRUB:
+            register_scrub_callbacks(self.update_map_figures, self.years, self.ids['store'],
+                                     self.ids['choropleth'], self.ids['violin'], self.name)
+            return
+
+        def update_maps(indicator, income, year, stamp):
+            # a year slider move only changes the data arrays, so those are sent as partial updates
+            # when the figures in the browser are those of the selected indicator and income group
+            if year_only_change(stamp, indicator, income):
+                return year_patches(*load_indicator_table(indicator, self.years), income, year) + (no_update,)
+            return self.update_map_figures(indicator, income, year) + (figure_stamp(indicator, income),)
+
+        callback(
+            Output(self.ids['choropleth'], 'figure'),
+            Output(self.ids['violin'], 'figure'),
+            Output(self.ids['stamp'], 'data'),
+            Input('indicator_dropdown', 'value'),
+            Input('income_dropdown', 'value'),
+            Input('year_slider', 'value'),
+            State(self.ids['stamp'], 'data'))(metrics.instrument(update_maps, self.name + '.update_maps'))
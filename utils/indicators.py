@@ -0,0 +1,67 @@
+# shared, cached queries for the indicator data shown on the pages
+
+from utils.bundle import static_bundle
+from utils.cache import table_cache
+from utils.datasource import get_data_source
+from utils.filters import IncomeIndex
+from utils.metrics import metrics
+
+# data source every page reads from (postgres or the ETL's arrow files, see utils/datasource.py)
+data_source = get_data_source()
+
+# drop cached tables when the data source reports a table was reloaded by the ETL
+table_cache.set_version_source(data_source.versions)
+
+
+# (table, first year, last year) ranges already checked against the data source in this process
+checked_years = set()
+
+
+def check_years(table, years):
+    # check the year columns exist in table once per process - called on a page's first visit
+    # rather than at import, so workers start without waiting on (or failing with) the database -
+    # and skipped when the figures are served from a static bundle
+    key = (table, min(years), max(years))
+    if static_bundle is None and key not in checked_years:
+        try:
+            data_source.check_years(table, years)
+        except Exception as e:
+            # the page shows as unavailable (see index.py) and the check runs again on the next visit
+            print("Year check of {} failed: {}".format(table, e))
+            return False
+        checked_years.add(key)
+    return True
+
+
+def load_indicator_table(indicator, years):
+    # return the indicator table (country_code, income_group, country_name, one column per int year)
+    # and the IncomeIndex of its rows from the shared cache, reading the data source on a cache miss
+    def query():
+        with metrics.stage('query'):
+            df = data_source.indicator_frame(indicator, years)
+        with metrics.stage('index'):
+            return df, IncomeIndex(df['income_group'])
+
+    return table_cache.get(indicator, years, query)
+
+
+def load_indicator(indicator, years):
+    # return only the indicator table of load_indicator_table()
+    return load_indicator_table(indicator, years)[0]
+
+
+def load_medians(indicator, years):
+    # return the yearly median of each income group (years in the rows, income groups in the
+    # columns) from the indicator_summary relation built by ETL/load_data.py
+    def query():
+        with metrics.stage('medians_query'):
+            df = data_source.medians(indicator, years)
+        if df is None:
+            # summary relation not built for this indicator yet - calculate the medians from the table
+            df, income_index = load_indicator_table(indicator, years)
+            with metrics.stage('medians_groupby'):
+                df_no_uc = income_index.select(df, "World")[1]
+                return df_no_uc.groupby('income_group').median('numeric_only').transpose()
+        return df
+
+    return table_cache.get('indicator_summary', years, query, variant = indicator)
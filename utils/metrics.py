@@ -0,0 +1,183 @@
+# timing instrumentation of the page callbacks - stage durations (query, filter, figure,
+# serialize, ...) are kept per (callback, stage, indicator) and summarized as percentiles on the
+# /metrics endpoint of app.server
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+# define how many recent durations are kept per (callback, stage, indicator), whether every
+# duration is also printed as a json line (structured log), the path of the metrics endpoint
+# (empty to disable it), and where the ETL step timings are
+METRICS_WINDOW = int(os.environ.get('METRICS_WINDOW', 1024))
+METRICS_LOG = os.environ.get('METRICS_LOG', '0') == '1'
+METRICS_ENDPOINT = os.environ.get('METRICS_ENDPOINT', '/metrics')
+ETL_METRICS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'etl_metrics.json')
+
+# percentiles reported for every (callback, stage, indicator)
+PERCENTILES = (50, 90, 99)
+
+# indicator recorded for callbacks called with an indicator no page offers (the indicator is a
+# callback input, so any client can send new values)
+OTHER_INDICATOR = 'other'
+
+
+def percentile(samples, q):
+    # helper function returns the q-th percentile of a sorted list (nearest rank)
+    rank = max(int(round(q / 100 * len(samples) + 0.5)) - 1, 0)
+    return samples[min(rank, len(samples) - 1)]
+
+
+class Metrics:
+    # windows of recent durations (in seconds) keyed by (callback, stage, indicator)
+
+    def __init__(self, window=METRICS_WINDOW, log=METRICS_LOG):
+        self.window = window
+        self.log = log
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._context = threading.local()
+        self._indicators = set()
+
+    def add_indicators(self, indicators):
+        # register the indicators offered by a page - callbacks for any other indicator are
+        # recorded under OTHER_INDICATOR, so clients can't add unbounded keys
+        with self._lock:
+            self._indicators.update(indicators)
+
+    def indicator_key(self, indicator):
+        # return the indicator a callback's durations are recorded under
+        if indicator is None or indicator in self._indicators:
+            return indicator
+        return OTHER_INDICATOR
+
+    def observe(self, callback, stage, seconds, indicator=None):
+        # record one duration
+        key = (callback, stage, indicator)
+        with self._lock:
+            if key not in self._samples:
+                self._samples[key] = deque(maxlen = self.window)
+                self._counts[key] = 0
+            self._samples[key].append(seconds)
+            self._counts[key] += 1
+        if self.log:
+            print(json.dumps({'metric': 'duration', 'callback': callback, 'stage': stage,
+                              'indicator': indicator, 'ms': round(seconds * 1000, 3), 'time': time.time()}), flush = True)
+
+    @contextmanager
+    def callback(self, name, indicator=None):
+        # time a callback as its 'total' stage - stages recorded in the same thread while it runs
+        # (see stage() and laps()) are attributed to it
+        outer = getattr(self._context, 'current', None)
+        indicator = self.indicator_key(indicator)
+        self._context.current = (name, indicator)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, 'total', time.perf_counter() - start, indicator)
+            self._context.current = outer
+
+    def instrument(self, func, name=None):
+        # decorator timing a page function taking the indicator as first argument (name defaults
+        # to '<module>.<function>')
+        name = name or func.__module__.split('.')[-1] + '.' + func.__name__
+
+        @wraps(func)
+        def wrapper(indicator, *args):
+            with self.callback(name, indicator):
+                return func(indicator, *args)
+
+        return wrapper
+
+    def current(self):
+        # return the (callback, indicator) running in this thread
+        return getattr(self._context, 'current', None) or ('none', None)
+
+    @contextmanager
+    def stage(self, stage):
+        # time a block as a stage of the running callback
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            callback, indicator = self.current()
+            self.observe(callback, stage, time.perf_counter() - start, indicator)
+
+    def laps(self):
+        # return a lap timer for a callback body - each lap(stage) records the time since the previous lap
+        return LapTimer(self)
+
+    def summary(self):
+        # return the count, mean, max, and percentiles (in milliseconds) of every (callback, stage,
+        # indicator), plus every (callback, stage) over all indicators (indicator None)
+        with self._lock:
+            samples = {key: list(values) for key, values in self._samples.items()}
+            counts = dict(self._counts)
+        for (callback, stage, indicator), values in list(samples.items()):
+            if indicator is not None:
+                key = (callback, stage, None)
+                samples[key] = samples.get(key, []) + values
+                counts[key] = counts.get(key, 0) + counts[(callback, stage, indicator)]
+        rows = []
+        for key in sorted(samples, key = lambda key: tuple('' if k is None else k for k in key)):
+            values = sorted(samples[key])
+            row = {'callback': key[0], 'stage': key[1], 'indicator': key[2], 'count': counts[key],
+                   'mean_ms': round(sum(values) / len(values) * 1000, 3), 'max_ms': round(values[-1] * 1000, 3)}
+            for q in PERCENTILES:
+                row['p{}_ms'.format(q)] = round(percentile(values, q) * 1000, 3)
+            rows.append(row)
+        return rows
+
+    def reset(self):
+        # drop every recorded duration
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+class LapTimer:
+    # consecutive stage timer for the body of a callback, so stages don't have to be indented into blocks
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.last = time.perf_counter()
+
+    def lap(self, stage):
+        # record the time since the previous lap (or since the timer started) as stage
+        now = time.perf_counter()
+        callback, indicator = self.metrics.current()
+        self.metrics.observe(callback, stage, now - self.last, indicator)
+        self.last = now
+
+
+# metrics shared by every page module
+metrics = Metrics()
+
+
+def read_etl_metrics(path=ETL_METRICS_PATH):
+    # helper function returns the step timings of recent ETL runs written by ETL/load_data.py's run_etl()
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def register_metrics_endpoint(server, path=METRICS_ENDPOINT):
+    # serve the callback timings and the ETL step timings as json from the flask server
+    from flask import jsonify
+
+    if not path:
+        return None
+
+    @server.route(path)
+    def metrics_endpoint():
+        return jsonify({'callbacks': metrics.summary(), 'etl': read_etl_metrics()})
+
+    return metrics_endpoint
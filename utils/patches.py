@@ -0,0 +1,39 @@
+# partial figure updates for year slider moves - only the year-dependent data arrays of the
+# choropleth and violin plot are sent to the browser instead of both rebuilt figures
+from dash import Patch, ctx
+
+from utils.bundle import static_bundle
+from utils.fast_json import compact
+from utils.figure_templates import trace_order
+
+
+def figure_stamp(indicator, income):
+    # helper function returns the stamp kept in a dcc.Store next to the choropleth and violin plot,
+    # recording the indicator and income group of the figures last sent to the browser
+    return {'indicator': indicator, 'income': income}
+
+
+def year_only_change(stamp, indicator, income):
+    # helper function checks whether the year slider is the only input that triggered the callback
+    # and the figures in the browser show the selected indicator and income group - a full render
+    # superseded by a later request is dropped by the browser together with its stamp, so a year
+    # patch is never applied to the figures of another indicator or income group (figures in static
+    # mode always come from the bundle, since there's no table to take the values from)
+    return static_bundle is None and set(ctx.triggered_prop_ids) == {'year_slider.value'} \
+        and stamp == figure_stamp(indicator, income)
+
+
+def year_patches(df, income_index, income, year):
+    # helper function patches the choropleth z values and the x values of each violin plot trace
+    # with the values of a new year, filtering the indicator df the same way the pages do
+    filtered_df, filtered_df_no_uc = income_index.select(df, income, ['income_group', year])
+
+    choropleth = Patch()
+    choropleth['data'][0]['z'] = compact(filtered_df[year]).tolist()
+
+    # violin plot has one trace per income group present, in INCOME_ORDER then order of appearance
+    violin = Patch()
+    groups = filtered_df_no_uc['income_group']
+    for index, group in enumerate(trace_order(groups.unique())):
+        violin['data'][index]['x'] = compact(filtered_df_no_uc.loc[groups == group, year]).tolist()
+    return choropleth, violin
@@ -0,0 +1,55 @@
+# optional clientside year scrubbing - the year matrix of the selected indicator and income group is
+# sent to the browser once through a dcc.Store, and assets/scrub.js recolors the choropleth and
+# violin plot on year slider changes without a server round trip
+import os
+
+import numpy as np
+from dash import Input, Output, ClientsideFunction, callback, clientside_callback
+
+from utils.fast_json import compact
+from utils.indicators import load_indicator_table
+from utils.metrics import metrics
+
+# define whether the pages register the clientside scrubbing callbacks (CLIENTSIDE_SCRUB=1)
+# instead of rebuilding every figure on the server for each year slider move
+CLIENTSIDE_SCRUB = os.environ.get('CLIENTSIDE_SCRUB', '0') == '1'
+
+
+def year_data(df, income_index, income, years, choropleth, violin):
+    # helper function packs the countries of the selected income group, their indicator value in
+    # every year, and the choropleth and violin figures (as templates) into the store contents
+    df = income_index.select(df, income)[0]
+    return {
+        'names': df['country_name'].tolist(),
+        'groups': df['income_group'].tolist(),
+        # missing values are sent as null so the store stays valid json
+        'values': {str(year): [None if np.isnan(value) else value for value in compact(df[year]).tolist()] for year in years},
+        'choropleth': choropleth,
+        'violin': violin,
+    }
+
+
+def register_scrub_callbacks(update_map_figures, years, store_id, choropleth_id, violin_id, page):
+    # register a server callback that refreshes the store when the indicator or income group
+    # changes, and a clientside callback that redraws the year-dependent figures
+    name = page + '.update_year_data'
+
+    @callback(
+        Output(store_id, 'data'),
+        Input('indicator_dropdown', 'value'),
+        Input('income_dropdown', 'value'))
+    def update_year_data(indicator, income):
+        # render the figures of the first year to use their layout and styling as templates
+        with metrics.callback(name, indicator):
+            choropleth, violin = update_map_figures(indicator, income, min(years))
+            with metrics.stage('pack'):
+                return year_data(*load_indicator_table(indicator, years), income, years, choropleth, violin)
+
+    clientside_callback(
+        ClientsideFunction(namespace = 'scrub', function_name = 'update_year'),
+        Output(choropleth_id, 'figure'),
+        Output(violin_id, 'figure'),
+        Input('year_slider', 'value'),
+        Input(store_id, 'data'))
+
+    return update_year_data